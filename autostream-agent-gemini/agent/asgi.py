@@ -0,0 +1,110 @@
+import asyncio
+import traceback
+
+# Minimal HTTP/1.1 server for ASGI apps, so the webhook (and its load test)
+# run without uvicorn installed. It handles keep-alive and Content-Length
+# bodies, which is all the WhatsApp webhook needs; use uvicorn or another
+# real ASGI server in production.
+
+MAX_BODY = 1 << 20
+
+_REASONS = {200: b"OK", 400: b"Bad Request", 403: b"Forbidden", 404: b"Not Found",
+            411: b"Length Required", 413: b"Payload Too Large", 500: b"Internal Server Error"}
+
+
+async def serve(app, host="127.0.0.1", port=8000, started=None):
+    # Serves until cancelled. started, if given, is a callback receiving the
+    # bound (host, port), useful with port=0.
+    server = await asyncio.start_server(lambda r, w: _connection(app, r, w, host, port), host, port)
+    if started is not None:
+        started(server.sockets[0].getsockname()[:2])
+    async with server:
+        await server.serve_forever()
+
+
+async def _connection(app, reader, writer, host, port):
+    client = writer.get_extra_info("peername")
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                return
+            method, target, version = request_line.decode("latin-1").split()
+            headers = []
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers.append((name.strip().lower().encode("latin-1"), value.strip().encode("latin-1")))
+            header_map = dict(headers)
+
+            if b"chunked" in header_map.get(b"transfer-encoding", b""):
+                await _write(writer, 411, [], b"")
+                return
+            length = int(header_map.get(b"content-length", b"0"))
+            if length > MAX_BODY:
+                await _write(writer, 413, [], b"")
+                return
+            body = await reader.readexactly(length) if length else b""
+
+            path, _, query = target.partition("?")
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": version.split("/")[-1],
+                "method": method.upper(),
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode("latin-1"),
+                "query_string": query.encode("latin-1"),
+                "root_path": "",
+                "headers": headers,
+                "client": client,
+                "server": (host, port),
+            }
+            keep_alive = header_map.get(b"connection", b"").lower() != b"close" and version == "HTTP/1.1"
+            await _handle(app, scope, body, writer, keep_alive)
+            if not keep_alive:
+                return
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _handle(app, scope, body, writer, keep_alive):
+    received = False
+    response = {"status": 500, "headers": [], "body": []}
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        traceback.print_exc()
+        response = {"status": 500, "headers": [], "body": []}
+    headers = [(k, v) for k, v in response["headers"] if k.lower() != b"content-length"]
+    if not keep_alive:
+        headers.append((b"connection", b"close"))
+    await _write(writer, response["status"], headers, b"".join(response["body"]))
+
+
+async def _write(writer, status, headers, body):
+    lines = [b"HTTP/1.1 %d %s" % (status, _REASONS.get(status, b"Unknown"))]
+    lines += [name + b": " + value for name, value in headers]
+    lines.append(b"content-length: %d" % len(body))
+    writer.write(b"\r\n".join(lines) + b"\r\n\r\n" + body)
+    await writer.drain()
@@ -0,0 +1,85 @@
+# How far back (in history entries) a plan mention still resolves an
+# ambiguous pricing question like "and the price?"
+PLAN_CONTEXT_TURNS = 6
+
+_PLANS = ("pro", "basic")
+
+
+class ConversationContext:
+    """Conversation features the router and retriever need, kept up to date
+    as turns happen instead of being recomputed from the history each turn.
+
+    ``observe_user`` and ``observe_agent`` are called once per message with
+    work proportional to that message; every read is O(1), however long the
+    conversation gets.
+    """
+
+    __slots__ = ("turns", "plan_turns", "last_agent_message", "user_categories")
+
+    def __init__(self):
+        self.turns = 0                 # history entries observed so far
+        self.plan_turns = {}           # plan -> turn number of its latest user mention
+        self.last_agent_message = ""   # lowercased
+        self.user_categories = frozenset()  # routing categories of the latest user message
+
+    def observe_user(self, matched):
+        # matched: match_categories() of the user message, computed once by the router
+        self.turns += 1
+        self.user_categories = matched
+        for plan in _PLANS:
+            if plan in matched:
+                self.plan_turns[plan] = self.turns
+
+    def observe_agent(self, text):
+        self.turns += 1
+        self.last_agent_message = text.lower()
+
+    def recent_plans(self, turns=PLAN_CONTEXT_TURNS):
+        # Plans the user mentioned within the last `turns` history entries
+        return {plan for plan, turn in self.plan_turns.items() if self.turns - turn < turns}
+
+    def snapshot(self):
+        return ContextSnapshot(self)
+
+    @classmethod
+    def from_history(cls, history):
+        # Rebuilds the features by replaying a history (e.g. an older saved session)
+        from agent.matcher import match_categories
+
+        context = cls()
+        for role, text in history:
+            if role == "user":
+                context.observe_user(match_categories(text))
+            else:
+                context.observe_agent(text)
+        return context
+
+    def to_list(self):
+        return [self.turns, self.plan_turns]
+
+    @classmethod
+    def from_list(cls, values, history=()):
+        context = cls()
+        # Older sessions also stored the last plan and topic; they're unused
+        context.turns, context.plan_turns = values[:2]
+        for role, text in reversed(history):
+            if role == "assistant":
+                context.last_agent_message = text.lower()
+                break
+        return context
+
+
+class ContextSnapshot:
+    """Read-only copy of the features the retriever reads, taken at one
+    moment, for work that runs alongside the turn (speculative retrieval)
+    while the live ConversationContext keeps changing.
+    """
+
+    __slots__ = ("user_categories", "_recent_plans")
+
+    def __init__(self, context):
+        self.user_categories = frozenset(context.user_categories)
+        self._recent_plans = frozenset(context.recent_plans())
+
+    def recent_plans(self):
+        return self._recent_plans
@@ -1,29 +1,167 @@
 
-from agent.intent import detect_intent
+import asyncio
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.context import ConversationContext
+from agent.history import ConversationHistory
+from agent.intent import detect_intent_local, detect_intent_with_llm, detect_intent_with_llm_async
+from agent.matcher import match_categories
 from agent.rag import retrieve_answer
 from agent.tools import mock_lead_capture
+from agent.tracing import set_attribute, span, tag_turn
+
+# Target size (characters) of each streamed chunk
+CHUNK_SIZE = 48
+_CHUNK_RE = re.compile(r"[^\n]*\n|[^\n]+")
+_WORD_RE = re.compile(r"\S+\s*")
+
+# Threads that compute the RAG answer while Gemini classifies the message
+# (0 turns speculative retrieval off)
+SPECULATION_WORKERS = int(os.getenv("SPECULATION_WORKERS", "4"))
+_speculation_pool = None
+_speculation_lock = threading.Lock()
 
 def agent_step(state, user_message):
+    # One trace span per turn, with child spans for each hot path (see agent/tracing.py)
+    with span("agent_step"):
+        with span("route"):
+            response = route_without_llm(state, user_message)
+        if response is None:
+            # Detect intent for new messages
+            speculative = None
+            with span("detect_intent"):
+                intent = detect_intent_local(user_message)
+                if intent is None:
+                    # Gemini is needed: retrieve the product answer meanwhile,
+                    # so the turn costs max(LLM, RAG) instead of their sum
+                    speculative = speculate_retrieval(state, user_message)
+                    try:
+                        intent = detect_intent_with_llm(user_message)
+                    except BaseException:
+                        discard(speculative)
+                        raise
+                state.intent = intent
+            response = respond_to_intent(state, user_message, speculative)
+        
+        # Add agent response to history
+        state.conversation_history.append(("assistant", response))
+        state.context.observe_agent(response)
+        return response
+
+async def agent_step_async(state, user_message):
+    # Same routing as agent_step, but the Gemini call doesn't block the event loop
+    with span("agent_step"):
+        with span("route"):
+            if getattr(state, "intent", None) == "high_intent" and not state.lead_captured:
+                # Lead collection may call mock_lead_capture, and LeadWriter.submit
+                # can block (backpressure, then an inline write): keep it off the loop
+                response = await asyncio.to_thread(route_without_llm, state, user_message)
+            else:
+                response = route_without_llm(state, user_message)
+        if response is None:
+            speculative = None
+            with span("detect_intent"):
+                intent = detect_intent_local(user_message)
+                if intent is None:
+                    speculative = speculate_retrieval(state, user_message)
+                    try:
+                        intent = await detect_intent_with_llm_async(user_message)
+                    except BaseException:
+                        discard(speculative)
+                        raise
+                state.intent = intent
+            if speculative is not None and intent == "product_inquiry" and not speculative.done():
+                # Wait for the rest of the retrieval without blocking the loop
+                await asyncio.wait([asyncio.wrap_future(speculative)])
+            response = respond_to_intent(state, user_message, speculative)
+        
+        state.conversation_history.append(("assistant", response))
+        state.context.observe_agent(response)
+        return response
+
+def speculate_retrieval(state, user_message):
+    # Starts retrieve_answer on the speculation pool; returns its future, or
+    # None when speculation is off. cancel() can't stop a retrieval that is
+    # already running, so a discarded one may still be going when the turn
+    # moves on: it gets snapshots of the history and context, never the
+    # live objects the turn keeps mutating.
+    global _speculation_pool
+    if SPECULATION_WORKERS <= 0:
+        return None
+    if _speculation_pool is None:
+        with _speculation_lock:
+            if _speculation_pool is None:
+                _speculation_pool = ThreadPoolExecutor(
+                    max_workers=SPECULATION_WORKERS, thread_name_prefix="speculative-rag"
+                )
+    return _speculation_pool.submit(
+        retrieve_answer, user_message, tuple(state.conversation_history), state.context.snapshot()
+    )
+
+def discard(speculative):
+    # Drops a speculative result that won't be used (cancels it if not started)
+    if speculative is not None:
+        speculative.cancel()
+
+def agent_step_stream(state, user_message, chunk_size=CHUNK_SIZE):
+    # Generator variant of agent_step for incremental rendering (st.write_stream,
+    # CLI printing). Display-only: the turn runs exactly as in agent_step, so
+    # the whole reply (and the updated state) exists before the first chunk,
+    # which is then yielded in line/word-sized pieces.
+    yield from iter_chunks(agent_step(state, user_message), chunk_size)
+
+async def agent_step_astream(state, user_message, chunk_size=CHUNK_SIZE):
+    # Async-iterator variant built on agent_step_async
+    for chunk in iter_chunks(await agent_step_async(state, user_message), chunk_size):
+        yield chunk
+
+def iter_chunks(text, chunk_size=CHUNK_SIZE):
+    # Splits on line breaks first, then packs words into chunks of about
+    # chunk_size characters; "".join(iter_chunks(text)) == text
+    for line in _CHUNK_RE.findall(text):
+        if len(line) <= chunk_size:
+            yield line
+            continue
+        leading = len(line) - len(line.lstrip(" "))
+        buffer = line[:leading]
+        for word in _WORD_RE.findall(line, leading):
+            if buffer and len(buffer) + len(word) > chunk_size:
+                yield buffer
+                buffer = ""
+            buffer += word
+        if buffer:
+            yield buffer
+
+def route_without_llm(state, user_message):
+    # Handles every branch that doesn't need intent detection.
+    # Returns None when the message has to go through detect_intent.
     # Ensure conversation_history exists (for backward compatibility)
     if not hasattr(state, 'conversation_history'):
-        from typing import List, Tuple
-        state.conversation_history: List[Tuple[str, str]] = []
+        state.conversation_history = ConversationHistory()
+    if not hasattr(state, 'context'):
+        state.context = ConversationContext.from_history(state.conversation_history)
+    
+    # The agent's previous reply, lowercased once when it was sent
+    last_agent_msg = state.context.last_agent_message
     
     # Add user message to conversation history
     state.conversation_history.append(("user", user_message))
     
+    # Every routing vocabulary is matched in a single pass over the message;
+    # the context keeps the result for the retriever
+    matched = match_categories(user_message)
+    state.context.observe_user(matched)
+    
     # If we're in the middle of collecting lead info, check if user is asking a question
     if state.intent == "high_intent" and not state.lead_captured:
-        user_msg_lower = user_message.lower()
-        
         # Check if user is asking a question instead of providing information
-        is_question = any(phrase in user_msg_lower for phrase in [
-            "why", "what", "how", "when", "where", "who", "which",
-            "do you need", "do you ask", "do you want", "do you require",
-            "need my", "ask for", "want my", "require my", "why do", "why did"
-        ]) or user_message.strip().endswith("?")
+        is_question = "question" in matched or user_message.strip().endswith("?")
         
         if is_question:
+            tag_turn("branch", "lead_collection_question")
             # User is asking a question, answer it based on what we're collecting
             if not state.name:
                 response = (
@@ -44,6 +182,7 @@ def agent_step(state, user_message):
                 # Shouldn't reach here, but handle it
                 response = "Could you please provide that information?"
         else:
+            tag_turn("branch", "lead_collection")
             # User provided information, collect it
             if not state.name:
                 state.name = user_message
@@ -55,39 +194,30 @@ def agent_step(state, user_message):
                 state.platform = user_message
                 # All fields collected, capture the lead
                 state.lead_captured = True
-                result = mock_lead_capture(state.name, state.email, state.platform)
+                with span("mock_lead_capture"):
+                    result = mock_lead_capture(state.name, state.email, state.platform)
                 response = f"{result['status']}"
         
-        # Add agent response to history
-        state.conversation_history.append(("assistant", response))
         return response
     
     # Check for questions about lead capture process (especially right after capture)
-    user_msg_lower = user_message.lower()
-    # Check if the last agent message was about lead capture
-    last_agent_msg = state.conversation_history[-1][1] if state.conversation_history and state.conversation_history[-1][0] == "assistant" else ""
-    
     # More flexible detection - check for key words that indicate questions about data collection
-    has_why_question = any(word in user_msg_lower for word in ["why", "what for", "purpose", "reason"])
-    has_details_reference = any(phrase in user_msg_lower for phrase in [
-        "details", "information", "data", "my", "you need", "you ask", "you collect",
-        "you require", "you want", "you needed", "you asked", "you collected"
-    ])
-    has_what_does = "what does" in user_msg_lower or "what do" in user_msg_lower
+    has_why_question = "why" in matched
+    has_details_reference = "details" in matched
+    has_what_does = "what_does" in matched
     
     is_lead_capture_question = (
         state.lead_captured and
         (
             (has_why_question and has_details_reference) or
-            (has_what_does and ("that" in user_msg_lower or "this" in user_msg_lower or "lead" in last_agent_msg.lower() or "captured" in last_agent_msg.lower())) or
-            any(phrase in user_msg_lower for phrase in [
-                "why these", "why my", "what about my", "what will you do", "what happens to"
-            ])
+            (has_what_does and ("this_that" in matched or "lead" in last_agent_msg or "captured" in last_agent_msg)) or
+            "lead_question" in matched
         )
     )
     
     if is_lead_capture_question:
-        response = (
+        tag_turn("branch", "lead_capture_question")
+        return (
             "I collected your details (name, email, and platform) to create your account and "
             "set up your AutoStream subscription. This information helps us:\n"
             "- Personalize your experience\n"
@@ -95,36 +225,35 @@ def agent_step(state, user_message):
             "- Understand which platform you create content on to provide relevant features\n\n"
             "Your information is secure and will only be used for account management and service delivery."
         )
-    else:
-        # Check for gratitude/thanks messages
-        user_msg_lower = user_message.lower().strip()
-        is_gratitude = any(phrase in user_msg_lower for phrase in [
-            "thanks", "thank you", "thank", "appreciate", "grateful", "ty", "thx"
-        ])
-        
-        if is_gratitude:
-            response = "You're welcome! Is there anything else I can help you with?"
-        else:
-            # Detect intent for new messages
-            state.intent = detect_intent(user_message)
-
-            if state.intent == "greeting":
-                response = "Hi! How can I help you with AutoStream today?"
-            elif state.intent == "product_inquiry":
-                # Use conversation history to provide context-aware answers
-                response = retrieve_answer(user_message, state.conversation_history)
-            elif state.intent == "high_intent":
-                # Reset lead capture state if starting a new high_intent flow
-                if state.lead_captured:
-                    # Reset for new lead
-                    state.name = None
-                    state.email = None
-                    state.platform = None
-                    state.lead_captured = False
-                response = "Great! May I know your name?"
-            else:
-                response = "How else can I help?"
     
-    # Add agent response to history
-    state.conversation_history.append(("assistant", response))
-    return response
+    # Check for gratitude/thanks messages
+    if "gratitude" in matched:
+        tag_turn("branch", "gratitude")
+        return "You're welcome! Is there anything else I can help you with?"
+    return None
+
+def respond_to_intent(state, user_message, speculative=None):
+    # speculative: future of a retrieve_answer started while intent was detected
+    tag_turn("branch", f"intent:{state.intent}")
+    if state.intent != "product_inquiry":
+        discard(speculative)
+    if state.intent == "greeting":
+        return "Hi! How can I help you with AutoStream today?"
+    elif state.intent == "product_inquiry":
+        # Use conversation history to provide context-aware answers
+        with span("retrieve_answer"):
+            if speculative is not None:
+                set_attribute("speculative", True)
+                return speculative.result()
+            return retrieve_answer(user_message, state.conversation_history, state.context)
+    elif state.intent == "high_intent":
+        # Reset lead capture state if starting a new high_intent flow
+        if state.lead_captured:
+            # Reset for new lead
+            state.name = None
+            state.email = None
+            state.platform = None
+            state.lead_captured = False
+        return "Great! May I know your name?"
+    else:
+        return "How else can I help?"
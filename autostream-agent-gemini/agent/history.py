@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+DEFAULT_TRANSCRIPT_PATH = project_root / "data" / "transcripts.jsonl"
+
+# Number of turns kept in memory per conversation (rag.py only looks at the last 6)
+DEFAULT_WINDOW = int(os.getenv("HISTORY_WINDOW", "20"))
+
+
+class Turn:
+    """One (role, text) entry; unpacks and indexes like the old tuples."""
+
+    __slots__ = ("role", "text")
+
+    def __init__(self, role, text):
+        self.role = role
+        self.text = text
+
+    def __iter__(self):
+        yield self.role
+        yield self.text
+
+    def __getitem__(self, index):
+        return (self.role, self.text)[index]
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        try:
+            return tuple(self) == tuple(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return f"Turn({self.role!r}, {self.text!r})"
+
+
+class TranscriptLog:
+    """Shared append-only JSONL log of every turn across all sessions."""
+
+    def __init__(self, path=DEFAULT_TRANSCRIPT_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def append(self, session_id, role, text):
+        line = json.dumps({"s": session_id, "r": role, "t": text, "ts": time.time()},
+                          separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ConversationHistory:
+    """Ring buffer of the most recent ``window`` turns.
+
+    Drop-in for the old ``List[Tuple[str, str]]``: supports ``append`` of
+    ``(role, text)`` tuples, ``len``, iteration, indexing and slicing. Older
+    turns are dropped; full transcripts go to an optional TranscriptLog.
+    """
+
+    def __init__(self, turns=(), window=None, transcript=None, session_id=None):
+        self.window = window or DEFAULT_WINDOW
+        self.transcript = transcript
+        self.session_id = session_id
+        self._turns = deque(maxlen=self.window)
+        for role, text in turns:
+            self._append(role, text)
+
+    def append(self, item):
+        role, text = item
+        if self.transcript is not None:
+            self.transcript.append(self.session_id, role, text)
+        self._append(role, text)
+
+    def _append(self, role, text):
+        self._turns.append(Turn(role, text))
+
+    def attach_transcript(self, transcript, session_id):
+        self.transcript = transcript
+        self.session_id = session_id
+
+    def __len__(self):
+        return len(self._turns)
+
+    def __bool__(self):
+        return bool(self._turns)
+
+    def __iter__(self):
+        return iter(self._turns)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self._turns))
+            # The common "last N" slice only walks N turns from the right
+            if step == 1 and stop == len(self._turns):
+                tail = list(islice(reversed(self._turns), stop - start))
+                tail.reverse()
+                return tail
+            return list(self._turns)[index]
+        return self._turns[index]
+
+    def __eq__(self, other):
+        if isinstance(other, ConversationHistory):
+            return list(self._turns) == list(other._turns)
+        try:
+            return [tuple(t) for t in self._turns] == [tuple(t) for t in other]
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return f"ConversationHistory({[tuple(t) for t in self._turns]!r}, window={self.window})"
@@ -1,49 +1,154 @@
+import asyncio
+import atexit
 import os
-import warnings
-from pathlib import Path
-from dotenv import load_dotenv
-import google.generativeai as genai
-from langchain_google_genai import ChatGoogleGenerativeAI
-
-# Suppress SSL warnings from gRPC (these are often false positives on macOS)
-os.environ['GRPC_VERBOSITY'] = 'ERROR'
-os.environ['GLOG_minloglevel'] = '2'
-warnings.filterwarnings('ignore', category=UserWarning)
-
-# Load environment variables from .env file (override system env vars)
-# Get the project root directory (parent of 'agent' folder)
-project_root = Path(__file__).parent.parent
-env_path = project_root / ".env"
-load_dotenv(dotenv_path=env_path, override=True)
-
-# Get API key from environment
-api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY or GEMINI_API_KEY must be set in .env file or environment")
-
-# Configure genai to use REST transport instead of gRPC to avoid SSL certificate issues
-genai.configure(api_key=api_key, transport="rest")
-
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    temperature=0,
-    api_key=api_key,
-    transport="rest"
+import threading
+import weakref
+from agent.intent_cache import IntentCache
+from agent.intent_rules import classify_by_rules, intent_tier_stats
+from agent.llm import built_llm, get_llm, llm_timeout
+
+# Max number of in-flight async Gemini calls per process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+
+# Micro-batching of LLM classifications: messages arriving within
+# INTENT_BATCH_WINDOW_MS (0 disables batching) share one Gemini call of up
+# to INTENT_BATCH_SIZE items
+INTENT_BATCH_WINDOW_MS = float(os.getenv("INTENT_BATCH_WINDOW_MS", "0"))
+INTENT_BATCH_SIZE = int(os.getenv("INTENT_BATCH_SIZE", "16"))
+
+INTENT_DEFINITIONS = (
+    "- greeting: Casual greetings like 'hi', 'hello', 'hey'\n"
+    "- product_inquiry: Questions about pricing, features, plans, refunds, support, or general product information\n"
+    "- high_intent: Expressions of strong interest in signing up, purchasing, or getting started, such as 'I want to sign up', 'I'm interested', 'let me try', 'I'd like to buy', 'sign me up'\n"
 )
 
+# Cache of LLM-classified intents keyed on normalized message text.
+# Set INTENT_CACHE_PATH to persist it across restarts.
+intent_cache = IntentCache(
+    maxsize=int(os.getenv("INTENT_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("INTENT_CACHE_TTL", "3600")),
+    path=os.getenv("INTENT_CACHE_PATH") or None,
+)
+atexit.register(intent_cache.save)
+
+def __getattr__(name):
+    # Backward compatible `agent.intent.llm`, built on first access
+    if name == "llm":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def detect_intent(message: str) -> str:
-    prompt = (
+    intent = detect_intent_local(message)
+    if intent is not None:
+        return intent
+    return detect_intent_with_llm(message)
+
+async def detect_intent_async(message: str) -> str:
+    intent = detect_intent_local(message)
+    if intent is not None:
+        return intent
+    return await detect_intent_with_llm_async(message)
+
+def detect_intent_local(message):
+    # Fast path: confident cases are resolved locally without a network call.
+    # Returns None when the message needs Gemini.
+    intent = classify_by_rules(message)
+    if intent is not None:
+        intent_tier_stats.hit("rules")
+        return intent
+
+    # Repeated messages reuse the earlier LLM answer (temperature=0)
+    intent = intent_cache.get(message)
+    if intent is not None:
+        intent_tier_stats.hit("cache")
+        return intent
+    return None
+
+def detect_intent_with_llm(message):
+    # Ambiguous messages escalate to Gemini
+    intent_tier_stats.hit("llm")
+    intent = classify_with_llm(message)
+    intent_cache.put(message, intent)
+    return intent
+
+async def detect_intent_with_llm_async(message):
+    intent_tier_stats.hit("llm")
+    try:
+        intent = await classify_with_llm_async(message)
+    except asyncio.TimeoutError:
+        # Don't stall the conversation (or cache a guess) when Gemini is slow
+        intent_tier_stats.event("llm_timeout")
+        return "product_inquiry"
+    intent_cache.put(message, intent)
+    return intent
+
+def classify_with_llm(message: str) -> str:
+    batcher = get_batcher()
+    if batcher is not None:
+        future = _submit_to_batcher(batcher, message)
+        if future is not None:
+            return future.result()
+    response = get_llm().invoke(build_intent_prompt(message))
+    return parse_intent(response.content)
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_batcher():
+    # Shared IntentBatcher, or None when batching is disabled
+    global _batcher
+    if INTENT_BATCH_WINDOW_MS <= 0:
+        return None
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                from agent.intent_batch import IntentBatcher
+                _batcher = IntentBatcher(window=INTENT_BATCH_WINDOW_MS / 1000, max_batch=INTENT_BATCH_SIZE)
+                atexit.register(_batcher.close)
+    return _batcher
+
+def _submit_to_batcher(batcher, message):
+    # The batcher's Future, or None once it has been closed (at exit), in
+    # which case the caller classifies the message with its own LLM call
+    from agent.intent_batch import BatcherClosed
+
+    try:
+        return batcher.submit(message)
+    except BatcherClosed:
+        return None
+
+# One limiter per event loop, since asyncio primitives can't be shared across loops
+_llm_semaphores = weakref.WeakKeyDictionary()
+
+async def classify_with_llm_async(message: str) -> str:
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _llm_semaphores[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+    async with semaphore:
+        timeout = llm_timeout()
+        batcher = get_batcher()
+        future = _submit_to_batcher(batcher, message) if batcher is not None else None
+        if future is not None:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        # Building the client imports the SDKs and can take seconds: do the
+        # first build on a thread so it doesn't stall the event loop
+        llm = built_llm() or await asyncio.to_thread(get_llm)
+        response = await asyncio.wait_for(llm.ainvoke(build_intent_prompt(message)), timeout)
+    return parse_intent(response.content)
+
+def build_intent_prompt(message: str) -> str:
+    return (
         "You are an intent classification engine for AutoStream, a video editing SaaS product.\n"
         "Classify the user message into exactly ONE intent from this list:\n"
-        "- greeting: Casual greetings like 'hi', 'hello', 'hey'\n"
-        "- product_inquiry: Questions about pricing, features, plans, refunds, support, or general product information\n"
-        "- high_intent: Expressions of strong interest in signing up, purchasing, or getting started, such as 'I want to sign up', 'I'm interested', 'let me try', 'I'd like to buy', 'sign me up'\n\n"
+        + INTENT_DEFINITIONS + "\n"
         "User message: {message}\n\n"
         "Respond with ONLY the intent word (greeting, product_inquiry, or high_intent)."
     ).format(message=message)
 
-    response = llm.invoke(prompt)
-    intent = response.content.strip().lower()
+def parse_intent(content: str) -> str:
+    intent = content.strip().lower()
 
     # Clean up the response in case LLM adds extra text
     if "greeting" in intent:
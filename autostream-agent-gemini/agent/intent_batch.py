@@ -0,0 +1,146 @@
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from agent.intent import INTENT_DEFINITIONS, build_intent_prompt, parse_intent
+from agent.llm import get_llm
+
+_LINE_RE = re.compile(r"^\s*(\d+)\s*[:.)\-]\s*([a-z_ ]+)", re.MULTILINE)
+
+
+class BatcherClosed(RuntimeError):
+    pass
+
+
+def build_batch_prompt(messages):
+    numbered = "\n".join(f"{i}. {' '.join(m.split())}" for i, m in enumerate(messages, 1))
+    return (
+        "You are an intent classification engine for AutoStream, a video editing SaaS product.\n"
+        "Classify EACH numbered user message below into exactly ONE intent from this list:\n"
+        f"{INTENT_DEFINITIONS}\n"
+        f"User messages:\n{numbered}\n\n"
+        "Respond with one line per message in the form '<number>: <intent>' and nothing else."
+    )
+
+
+def parse_batch_response(content, count):
+    # Returns {index: intent} for every line we could read; callers fall back
+    # to single-message calls for anything missing
+    labels = {}
+    for number, label in _LINE_RE.findall(content.lower()):
+        index = int(number) - 1
+        if 0 <= index < count and index not in labels:
+            labels[index] = parse_intent(label)
+    return labels
+
+
+class IntentBatcher:
+    """Collects messages for up to ``window`` seconds (or ``max_batch`` of them)
+    and classifies them with one multi-item LLM call.
+
+    ``submit`` returns a Future; ``classify`` blocks on it. Batches are sent
+    on a small thread pool so a slow batch doesn't hold up the next one.
+    Items the model's reply doesn't cover are re-asked one at a time.
+    """
+
+    def __init__(self, llm=None, window=0.005, max_batch=16, max_inflight=8):
+        self._llm = llm
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self.fallbacks = 0
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="intent-batch")
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._collect, name="intent-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def llm(self):
+        return self._llm if self._llm is not None else get_llm()
+
+    def submit(self, message):
+        future = Future()
+        # Checked and enqueued under the lock close() takes to enqueue its
+        # sentinel, so an accepted item is always ahead of the sentinel
+        with self._close_lock:
+            if self._closed:
+                raise BatcherClosed("IntentBatcher is closed")
+            self._queue.put((message, future))
+        return future
+
+    def classify(self, message):
+        return self.submit(message).result()
+
+    def _collect(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._pool.submit(self._run, batch)
+                    return
+                batch.append(item)
+            self._pool.submit(self._run, batch)
+
+    def _run(self, batch):
+        # Callers that gave up (e.g. timed out in classify_with_llm_async)
+        # have cancelled their futures: skip them. The rest are marked
+        # running, so a late cancel can no longer race set_result.
+        batch = [(message, future) for message, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        messages = [message for message, _ in batch]
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+        try:
+            if len(batch) == 1:
+                labels = {0: parse_intent(self.llm.invoke(build_intent_prompt(messages[0])).content)}
+            else:
+                labels = parse_batch_response(self.llm.invoke(build_batch_prompt(messages)).content, len(batch))
+            for index, message in enumerate(messages):
+                if index not in labels:
+                    # Unparseable or missing line: classify this one on its own
+                    with self._stats_lock:
+                        self.fallbacks += 1
+                    labels[index] = parse_intent(self.llm.invoke(build_intent_prompt(message)).content)
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for index, (_, future) in enumerate(batch):
+            future.set_result(labels[index])
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "fallbacks": self.fallbacks,
+        }
+
+    def close(self):
+        # Flushes whatever is queued, then waits for in-flight batches
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,109 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+_PUNCT_RE = re.compile(r"[^\w\s']")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    # "  Pricing?? " and "pricing" share a key: lowercase, drop punctuation
+    # (including trailing "?"), collapse whitespace
+    text = _PUNCT_RE.sub(" ", message.lower())
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+class IntentCache:
+    """Bounded LRU cache of intents with a per-entry TTL.
+
+    Keys are normalized message text. The LLM runs at temperature=0, so a
+    cached label is as good as a fresh one until the TTL expires. If ``path``
+    is given, entries are loaded from and saved to a JSON file so the cache
+    survives restarts.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600.0, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()  # key -> (intent, expires_at)
+        self._lock = threading.Lock()
+        if self.path:
+            self.load()
+
+    def get(self, message):
+        key = normalize_message(message)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, message, intent):
+        key = normalize_message(message)
+        with self._lock:
+            self._entries[key] = (intent, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r") as f:
+                items = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return
+        now = time.time()
+        with self._lock:
+            # Stored oldest-first, so re-inserting preserves LRU order
+            for key, intent, expires_at in items:
+                if expires_at > now:
+                    self._entries[key] = (intent, expires_at)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            items = [[key, intent, expires_at] for key, (intent, expires_at) in self._entries.items()]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(items, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,122 @@
+import re
+import threading
+from collections import Counter
+
+# Local rule tier for intent classification. Only messages the rules are
+# confident about are resolved here; anything else returns None and is
+# escalated to the LLM. The vocabulary mirrors the routing lists in graph.py/rag.py.
+
+GREETING_WORDS = [
+    "hi", "hello", "hey", "heya", "hiya", "howdy", "greetings", "yo", "sup",
+    "good morning", "good afternoon", "good evening", "hi there", "hello there", "hey there",
+]
+
+# Phrases like "i'll take" are too ambiguous ("i'll take a look") to list here
+HIGH_INTENT_PHRASES = [
+    "sign me up", "sign up", "signup", "i want to subscribe", "i'd like to subscribe",
+    "i want to buy", "i'd like to buy", "i would like to buy", "i want to purchase",
+    "i'd like to purchase", "i'm interested", "i am interested", "im interested",
+    "let me try", "i want to try", "i'd like to try", "get started", "i want to get started",
+    "i want the pro plan", "i want the basic plan",
+    "count me in", "ready to buy", "ready to start", "take my money",
+]
+
+# A negation this many words before a high-intent phrase ("I don't want to
+# sign up", "not ready to buy") sends the message to the LLM
+NEGATION_WINDOW = 3
+NEGATION_WORDS = {
+    "not", "no", "never", "don't", "dont", "won't", "wont", "can't", "cant",
+    "didn't", "didnt", "isn't", "isnt", "aren't", "arent", "nor",
+}
+
+PRODUCT_WORDS = [
+    "price", "prices", "pricing", "cost", "costs", "plan", "plans", "subscription", "monthly", "fee", "fees",
+    "pro", "professional", "premium", "basic", "starter", "standard",
+    "policy", "policies", "refund", "refunds", "money back", "cancel", "cancellation", "support",
+    "feature", "features", "capabilities", "resolution", "4k", "720p", "captions", "videos",
+    "difference", "compare", "comparison", "versus", "vs", "autostream",
+]
+
+QUESTION_WORDS = ["what", "why", "how", "when", "where", "who", "which", "does", "do", "is", "are", "can"]
+
+
+def _alternation(phrases):
+    # Longest first so "good morning" wins over "good", with word boundaries on both sides
+    escaped = sorted((re.escape(p) for p in phrases), key=len, reverse=True)
+    return r"\b(?:" + "|".join(escaped) + r")\b"
+
+
+_GREETING_ONLY_RE = re.compile(r"^(?:" + _alternation(GREETING_WORDS) + r"[\s,!.]*)+(?:autostream)?[\s!.]*$")
+_HIGH_INTENT_RE = re.compile(_alternation(HIGH_INTENT_PHRASES))
+_PRODUCT_RE = re.compile(_alternation(PRODUCT_WORDS))
+_QUESTION_START_RE = re.compile(r"^" + _alternation(QUESTION_WORDS))
+# Emoji and other symbols are ignored when checking for a bare greeting
+_SYMBOLS_RE = re.compile(r"[^\w\s,!.?']")
+
+
+def _is_negated(msg, start):
+    words = msg[:start].split()[-NEGATION_WINDOW:]
+    return any(word.strip(",!.?") in NEGATION_WORDS for word in words)
+
+
+def classify_by_rules(message: str):
+    msg = _SYMBOLS_RE.sub("", message.lower()).strip()
+    if not msg:
+        return None
+
+    if _GREETING_ONLY_RE.match(msg):
+        return "greeting"
+
+    is_question = msg.endswith("?") or bool(_QUESTION_START_RE.match(msg))
+    high_intent_matches = [match.start() for match in _HIGH_INTENT_RE.finditer(msg)]
+    has_product = bool(_PRODUCT_RE.search(msg))
+
+    if high_intent_matches:
+        # "sign me up" is high intent; "how do I sign up?", "I don't want to
+        # sign up" and "I'm interested in the refund policy" are ambiguous -> LLM
+        if is_question or has_product or any(_is_negated(msg, start) for start in high_intent_matches):
+            return None
+        return "high_intent"
+    if has_product:
+        return "product_inquiry"
+    return None
+
+
+class TierCounter:
+    """Thread-safe hit counter per classification tier.
+
+    ``event`` counts things that aren't a classification (e.g. LLM timeouts)
+    so they don't skew the per-tier ratio.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._events = Counter()
+        self._lock = threading.Lock()
+
+    def hit(self, tier):
+        with self._lock:
+            self._counts[tier] += 1
+
+    def event(self, name):
+        with self._lock:
+            self._events[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+            events = dict(self._events)
+        total = sum(counts.values())
+        counts["total"] = total
+        # Fraction of classified messages that never reached the LLM
+        counts["llm_skip_ratio"] = (total - counts.get("llm", 0)) / total if total else 0.0
+        counts.update(events)
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._events.clear()
+
+
+intent_tier_stats = TierCounter()
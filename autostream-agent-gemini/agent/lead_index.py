@@ -0,0 +1,272 @@
+"""SQLite index over captured leads, with dedupe and range queries.
+
+    python -m agent.lead_index count --platform youtube --since 2026-01-01   # captures
+    python -m agent.lead_index list --since 2026-01-14 --until 2026-01-15
+    python -m agent.lead_index lookup someone@example.com                    # latest details
+    python -m agent.lead_index rebuild
+"""
+import argparse
+import atexit
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+from agent.lead_store import get_lead_store
+
+project_root = Path(__file__).parent.parent
+DEFAULT_INDEX_PATH = project_root / "data" / "leads.db"
+
+_COLUMNS = ("email", "name", "platform", "timestamp", "first_seen", "captures")
+_CAPTURE_COLUMNS = ("email", "name", "platform", "timestamp")
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+def normalize_platform(platform):
+    return " ".join((platform or "").split()).lower()
+
+
+class LeadIndex:
+    """SQLite index over captured leads.
+
+    ``leads`` holds one row per normalized email (latest details, first seen,
+    number of captures) and is what dedupe checks. ``captures`` holds one row
+    per capture written to the lead log, indexed on (platform, timestamp), so
+    ``count`` and ``query`` see every capture, not just each email's latest.
+
+    ``upsert_many`` classifies each lead as "inserted" (new email), "updated"
+    (known email, different name or platform) or "duplicate" (same details
+    captured again) with a primary-key lookup, so dedupe stays O(1) however
+    many leads exist. Duplicates aren't logged, so they only bump the
+    email's capture count. Queries stream rows instead of loading the lead log.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leads ("
+            "email TEXT PRIMARY KEY, name TEXT, platform TEXT, timestamp TEXT, "
+            "first_seen TEXT, captures INTEGER NOT NULL DEFAULT 1)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS captures ("
+            "id INTEGER PRIMARY KEY, email TEXT NOT NULL, name TEXT, platform TEXT, timestamp TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS captures_platform_ts ON captures(platform, timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS captures_ts ON captures(timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS captures_email ON captures(email)")
+        # Indexes of the earlier one-row-per-email layout
+        self._conn.execute("DROP INDEX IF EXISTS leads_platform_ts")
+        self._conn.execute("DROP INDEX IF EXISTS leads_ts")
+
+    def upsert_many(self, leads, before_commit=None):
+        # Returns one outcome per lead: "inserted", "updated" or "duplicate".
+        # before_commit(outcomes) runs inside the transaction; if it raises,
+        # the index is rolled back.
+        outcomes = []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for lead in leads:
+                    outcomes.append(self._upsert(lead))
+                if before_commit is not None:
+                    before_commit(outcomes)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return outcomes
+
+    def _upsert(self, lead):
+        email = normalize_email(lead.get("email"))
+        name = lead.get("name")
+        platform = normalize_platform(lead.get("platform"))
+        timestamp = lead.get("timestamp")
+        row = self._conn.execute("SELECT name, platform FROM leads WHERE email = ?", (email,)).fetchone()
+        if row is None:
+            self._conn.execute(
+                "INSERT INTO leads (email, name, platform, timestamp, first_seen) VALUES (?, ?, ?, ?, ?)",
+                (email, name, platform, timestamp, timestamp),
+            )
+            outcome = "inserted"
+        else:
+            self._conn.execute(
+                "UPDATE leads SET name = ?, platform = ?, timestamp = ?, captures = captures + 1 WHERE email = ?",
+                (name, platform, timestamp, email),
+            )
+            outcome = "duplicate" if row == (name, platform) else "updated"
+        if outcome != "duplicate":
+            self._conn.execute(
+                "INSERT INTO captures (email, name, platform, timestamp) VALUES (?, ?, ?, ?)",
+                (email, name, platform, timestamp),
+            )
+        return outcome
+
+    def get(self, email):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM leads WHERE email = ?", (normalize_email(email),)
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def __contains__(self, email):
+        return self.get(email) is not None
+
+    def _where(self, platform, since, until):
+        # since is inclusive, until exclusive; both compare as ISO timestamp strings
+        clauses, params = [], []
+        if platform:
+            clauses.append("platform = ?")
+            params.append(normalize_platform(platform))
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, platform=None, since=None, until=None):
+        # Captures (new or changed leads) matching the filters
+        where, params = self._where(platform, since, until)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM captures{where}", params).fetchone()[0]
+
+    def query(self, platform=None, since=None, until=None, limit=None):
+        # Yields matching captures oldest first, fetched in pages. Reads use
+        # their own connection (WAL allows concurrent readers), so a long
+        # listing doesn't hold up the lead writer.
+        where, params = self._where(platform, since, until)
+        sql = f"SELECT {', '.join(_CAPTURE_COLUMNS)} FROM captures{where} ORDER BY timestamp, id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        conn = sqlite3.connect(str(self.path))
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                page = cursor.fetchmany(500)
+                if not page:
+                    return
+                for row in page:
+                    yield dict(zip(_CAPTURE_COLUMNS, row))
+        finally:
+            conn.close()
+
+    def rebuild(self, leads):
+        # Recreates the index from a stream of leads (e.g. the lead log). The
+        # delete and the re-inserts share one transaction, so a crash midway
+        # leaves the old index rather than an empty one.
+        count = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM leads")
+                self._conn.execute("DELETE FROM captures")
+                for lead in leads:
+                    self._upsert(lead)
+                    count += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def is_empty(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM captures LIMIT 1").fetchone() is None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class IndexedLeadSink:
+    """Lead writer sink: upserts into the index, and appends to the lead log
+    only leads that are new or changed, so repeat captures aren't logged twice.
+
+    An empty index is built from the existing log by ``prepare``, which the
+    LeadWriter runs on its own thread at startup, so the O(total leads) scan
+    never happens in a user's turn.
+    """
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+        self._prepared = False
+        self._prepare_lock = threading.Lock()
+
+    @property
+    def log_path(self):
+        return self.store.log_path
+
+    def prepare(self):
+        if not self._prepared:
+            with self._prepare_lock:
+                if not self._prepared:
+                    if self.index.is_empty():
+                        self.index.rebuild(self.store.iter_leads())
+                    self._prepared = True
+
+    def append_many(self, leads):
+        # Normally a no-op; covers writes that arrive before the writer
+        # thread got to prepare (e.g. a sink used on its own)
+        self.prepare()
+
+        def append_fresh(outcomes):
+            # The log is written before the index commits, so a failed write
+            # leaves neither of them updated
+            fresh = [lead for lead, outcome in zip(leads, outcomes) if outcome != "duplicate"]
+            if fresh:
+                self.store.append_many(fresh)
+
+        return self.index.upsert_many(leads, before_commit=append_fresh)
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_lead_index():
+    global _default_index
+    if _default_index is None:
+        with _default_lock:
+            if _default_index is None:
+                _default_index = LeadIndex()
+                atexit.register(_default_index.close)
+    return _default_index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the lead index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("count", "list"):
+        command = commands.add_parser(name)
+        command.add_argument("--platform")
+        command.add_argument("--since", help="inclusive, e.g. 2026-01-14")
+        command.add_argument("--until", help="exclusive, e.g. 2026-01-15")
+        if name == "list":
+            command.add_argument("--limit", type=int)
+    commands.add_parser("lookup").add_argument("email")
+    commands.add_parser("rebuild")
+    args = parser.parse_args()
+
+    index = get_lead_index()
+    if args.command == "count":
+        print(index.count(args.platform, args.since, args.until))
+    elif args.command == "list":
+        for lead in index.query(args.platform, args.since, args.until, args.limit):
+            print(json.dumps(lead))
+    elif args.command == "lookup":
+        lead = index.get(args.email)
+        print(json.dumps(lead) if lead else "not found")
+    else:
+        print(f"Indexed {index.rebuild(get_lead_store().iter_leads())} leads")
@@ -0,0 +1,209 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Cross-process file locking (fcntl on POSIX, msvcrt on Windows)
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+project_root = Path(__file__).parent.parent
+DEFAULT_LOG_PATH = project_root / "data" / "leads.jsonl"
+DEFAULT_JSON_PATH = project_root / "data" / "leads.json"
+
+
+def _lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class LeadStore:
+    """Append-only JSONL lead log.
+
+    Each capture appends one line under a file lock, so it costs O(1) no matter
+    how many leads exist and concurrent sessions never overwrite each other.
+    fsync is batched: it runs every ``fsync_every`` appends or once
+    ``fsync_interval`` seconds have passed since the last one, and on close.
+    ``export_json`` compacts the log back into the legacy ``leads.json`` array.
+    """
+
+    def __init__(self, log_path=DEFAULT_LOG_PATH, json_path=DEFAULT_JSON_PATH,
+                 fsync_every=8, fsync_interval=1.0):
+        self.log_path = Path(log_path)
+        self.json_path = Path(json_path) if json_path else None
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._mutex = threading.Lock()
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _open(self):
+        if self._file is None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            self.migrate()
+            self._file = open(self.log_path, "ab")
+        return self._file
+
+    def migrate(self):
+        # One-time import of a legacy leads.json array into the log.
+        # Only runs when the log doesn't exist yet; leads.json is left in place.
+        if self.log_path.exists() or not self.json_path or not self.json_path.exists():
+            return 0
+        try:
+            with open(self.json_path, "r") as f:
+                leads = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            leads = []
+        if not isinstance(leads, list):
+            leads = []
+
+        tmp_path = self.log_path.with_name(self.log_path.name + ".migrating")
+        with open(tmp_path, "wb") as f:
+            for lead in leads:
+                f.write(_encode(lead))
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            # Hard link fails if another process migrated first, so we never clobber its log
+            os.link(tmp_path, self.log_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+        return len(leads)
+
+    def append(self, lead):
+        self.append_many([lead])
+
+    def append_many(self, leads):
+        # One locked write (and at most one fsync) for a whole batch of leads
+        data = b"".join(_encode(lead) for lead in leads)
+        if not data:
+            return
+        with self._mutex:
+            f = self._open()
+            _lock(f)
+            try:
+                # Repair a torn tail left by a crash mid-write before appending
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0 and not _ends_with_newline(self.log_path):
+                    data = b"\n" + data
+                f.write(data)
+                f.flush()
+                self._pending += len(leads)
+                if (self._pending >= self.fsync_every
+                        or time.monotonic() - self._last_sync >= self.fsync_interval):
+                    self._sync()
+            finally:
+                _unlock(f)
+
+    def _sync(self):
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        with self._mutex:
+            self._sync()
+
+    def close(self):
+        with self._mutex:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def __iter__(self):
+        return self.iter_leads()
+
+    def iter_leads(self):
+        # Streams leads one at a time; a truncated last line from a crash is skipped
+        self.migrate()
+        if not self.log_path.exists():
+            return
+        with open(self.log_path, "rb") as f:
+            for raw in f:
+                raw = raw.strip()
+                if not raw:
+                    continue
+                try:
+                    yield json.loads(raw)
+                except json.JSONDecodeError:
+                    continue
+
+    def export_json(self, path=None):
+        # Compaction/export: write every lead as the legacy indented JSON array.
+        # Written to a temp file and renamed so readers never see a partial file.
+        path = Path(path) if path else self.json_path
+        self.flush()
+        tmp_path = path.with_name(path.name + ".tmp")
+        count = 0
+        with open(tmp_path, "w") as f:
+            f.write("[")
+            for lead in self.iter_leads():
+                f.write(",\n" if count else "\n")
+                f.write("\n".join("  " + l for l in json.dumps(lead, indent=2).splitlines()))
+                count += 1
+            f.write("\n]" if count else "]")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return count
+
+
+def _encode(lead):
+    return (json.dumps(lead, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_lead_store():
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = LeadStore()
+                atexit.register(_default_store.close)
+    return _default_store
+
+
+if __name__ == "__main__":
+    # python -m agent.lead_store export [path]  -> rebuild leads.json from the log
+    # python -m agent.lead_store migrate        -> import a legacy leads.json
+    store = LeadStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    if command == "migrate":
+        print(f"Migrated {store.migrate()} leads into {store.log_path}")
+    elif command == "export":
+        target = sys.argv[2] if len(sys.argv) > 2 else None
+        count = store.export_json(target)
+        print(f"Exported {count} leads to {target or store.json_path}")
+    else:
+        sys.exit(f"Unknown command: {command}")
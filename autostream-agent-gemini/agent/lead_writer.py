@@ -0,0 +1,227 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from pathlib import Path
+
+from agent.lead_index import IndexedLeadSink, get_lead_index
+from agent.lead_store import get_lead_store
+
+project_root = Path(__file__).parent.parent
+DEFAULT_DEAD_LETTER_PATH = project_root / "data" / "leads.failed.jsonl"
+
+# Background lead writing: captures are queued and persisted in batches so a
+# slow disk (or, in production, a slow CRM webhook) never stalls a chat turn
+LEAD_QUEUE_SIZE = int(os.getenv("LEAD_QUEUE_SIZE", "1024"))
+LEAD_BATCH_SIZE = int(os.getenv("LEAD_BATCH_SIZE", "64"))
+LEAD_FLUSH_MS = float(os.getenv("LEAD_FLUSH_MS", "200"))
+# How long submit() waits for room in a full queue before writing inline
+LEAD_BLOCK_MS = float(os.getenv("LEAD_BLOCK_MS", "50"))
+# A failed batch is retried this many times (backoff doubling from
+# LEAD_RETRY_MS) before its leads go to the dead-letter file
+LEAD_WRITE_RETRIES = int(os.getenv("LEAD_WRITE_RETRIES", "3"))
+LEAD_RETRY_MS = float(os.getenv("LEAD_RETRY_MS", "50"))
+
+
+class LeadWriter:
+    """Write-behind lead writer.
+
+    ``submit`` puts a lead on a bounded queue and returns a Future that
+    resolves once the lead is persisted: to the sink's per-lead outcome
+    (IndexedLeadSink reports "inserted", "updated" or "duplicate"), or True.
+    A worker thread hands queued leads to ``sink.append_many`` in batches of
+    up to ``batch_size``, at most ``flush_interval`` seconds after the first
+    one arrived. When the queue is
+    full, submit waits up to ``block_timeout`` for room and then writes the
+    lead itself, so producers slow down instead of leads being dropped; both
+    cases are counted in ``stats()``. ``close`` drains the queue.
+
+    A batch the sink rejects is logged and retried ``retries`` times. If it
+    still fails, its leads are appended to ``dead_letter_path`` (one JSON line
+    each, with the error) so they can be replayed, and their futures fail.
+    """
+
+    def __init__(self, sink=None, maxsize=LEAD_QUEUE_SIZE, batch_size=LEAD_BATCH_SIZE,
+                 flush_interval=LEAD_FLUSH_MS / 1000, block_timeout=LEAD_BLOCK_MS / 1000,
+                 retries=LEAD_WRITE_RETRIES, retry_backoff=LEAD_RETRY_MS / 1000,
+                 dead_letter_path=DEFAULT_DEAD_LETTER_PATH):
+        self.sink = sink if sink is not None else IndexedLeadSink(get_lead_store(), get_lead_index())
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_path = Path(dead_letter_path)
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.backpressure = 0
+        self.inline_writes = 0
+        self.blocked_seconds = 0.0
+        self.max_depth = 0
+        self._stats_lock = threading.Lock()
+        self._done = threading.Condition(self._stats_lock)
+        self._queue = queue.Queue(maxsize)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="lead-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, lead):
+        if self._closed:
+            raise RuntimeError("LeadWriter is closed")
+        future = Future()
+        with self._stats_lock:
+            self.submitted += 1
+        try:
+            self._queue.put_nowait((lead, future))
+        except queue.Full:
+            # Backpressure: wait briefly for the worker, then persist inline
+            t0 = time.monotonic()
+            try:
+                self._queue.put((lead, future), timeout=self.block_timeout)
+            except queue.Full:
+                self._write([(lead, future)], inline=True)
+            with self._stats_lock:
+                self.backpressure += 1
+                self.blocked_seconds += time.monotonic() - t0
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            if depth > self.max_depth:
+                self.max_depth = depth
+        return future
+
+    def _run(self):
+        # One-off sink setup (IndexedLeadSink builds its index from the lead
+        # log) runs here rather than in the first capture's turn
+        prepare = getattr(self.sink, "prepare", None)
+        if prepare is not None:
+            try:
+                prepare()
+            except Exception:
+                # append_many retries it and reports the error per lead
+                traceback.print_exc()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._write(batch)
+                    return
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch, inline=False):
+        leads = [lead for lead, _ in batch]
+        delay = self.retry_backoff
+        for attempt in range(self.retries + 1):
+            try:
+                outcomes = self.sink.append_many(leads)
+                break
+            except Exception as exc:
+                error = exc
+                print(f"Lead write failed (attempt {attempt + 1}/{self.retries + 1}): {exc!r}; "
+                      f"leads: {json.dumps(leads, default=str)}", file=sys.stderr)
+                if attempt < self.retries:
+                    with self._stats_lock:
+                        self.retried += 1
+                    time.sleep(delay)
+                    delay *= 2
+        else:
+            self._dead_letter(leads, error)
+            with self._stats_lock:
+                self.errors += len(batch)
+                self._done.notify_all()
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        with self._stats_lock:
+            self.written += len(batch)
+            if inline:
+                self.inline_writes += len(batch)
+            else:
+                self.batches += 1
+            self._done.notify_all()
+        if outcomes is None:
+            outcomes = [True] * len(batch)
+        for (_, future), outcome in zip(batch, outcomes):
+            future.set_result(outcome)
+
+    def _dead_letter(self, leads, error):
+        # Last resort for leads the sink kept rejecting: keep them on disk for replay
+        lines = "".join(json.dumps({"lead": lead, "error": repr(error)}, default=str) + "\n" for lead in leads)
+        try:
+            self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError:
+            print(f"Could not write {len(leads)} leads to {self.dead_letter_path}:", file=sys.stderr)
+            traceback.print_exc()
+            return
+        with self._stats_lock:
+            self.dead_lettered += len(leads)
+        print(f"Moved {len(leads)} leads to {self.dead_letter_path}", file=sys.stderr)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "submitted": self.submitted,
+                "written": self.written,
+                "batches": self.batches,
+                "avg_batch_size": (self.written - self.inline_writes) / self.batches if self.batches else 0.0,
+                "errors": self.errors,
+                "retried": self.retried,
+                "dead_lettered": self.dead_lettered,
+                "backpressure": self.backpressure,
+                "inline_writes": self.inline_writes,
+                "blocked_ms": self.blocked_seconds * 1000,
+                "max_depth": self.max_depth,
+            }
+
+    def flush(self, timeout=None):
+        # Blocks until everything submitted so far is persisted (or failed);
+        # returns False on timeout
+        with self._done:
+            target = self.submitted
+            return self._done.wait_for(lambda: self.written + self.errors >= target, timeout)
+
+    def close(self, timeout=None):
+        # Graceful shutdown: everything already queued is written before returning
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+
+_default_writer = None
+_default_lock = threading.Lock()
+
+
+def get_lead_writer():
+    global _default_writer
+    if _default_writer is None:
+        with _default_lock:
+            if _default_writer is None:
+                _default_writer = LeadWriter()
+                # Registered after the store's own close, so it runs first and
+                # the queue is drained into a still-open store
+                atexit.register(_default_writer.close)
+    return _default_writer
@@ -0,0 +1,194 @@
+import asyncio
+import os
+import re
+import threading
+import time
+import warnings
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+# Suppress SSL warnings from gRPC (these are often false positives on macOS)
+os.environ['GRPC_VERBOSITY'] = 'ERROR'
+os.environ['GLOG_minloglevel'] = '2'
+warnings.filterwarnings('ignore', category=UserWarning)
+
+# Get the project root directory (parent of 'agent' folder)
+project_root = Path(__file__).parent.parent
+env_path = project_root / ".env"
+
+_env_loaded = False
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def load_environment():
+    # Load environment variables from .env file (override system env vars),
+    # once, when the LLM is first built rather than at import time
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path=env_path, override=True)
+        _env_loaded = True
+
+
+def llm_timeout():
+    # Per-call timeout (seconds) for Gemini requests, LLM_TIMEOUT in the
+    # environment or .env
+    load_environment()
+    return float(os.getenv("LLM_TIMEOUT", "10"))
+
+GEMINI_MODEL = "gemini-2.0-flash"
+
+
+class LLMResponse:
+    __slots__ = ("content",)
+
+    def __init__(self, content):
+        self.content = content
+
+
+class LLMProvider(ABC):
+    """What detect_intent needs from an LLM: ``invoke``/``ainvoke`` returning
+    an object with ``.content`` (the same shape as a LangChain chat model).
+
+    Subclasses implement ``invoke``; the default ``ainvoke`` runs it on a
+    worker thread so blocking providers don't stall the event loop.
+    """
+
+    @abstractmethod
+    def invoke(self, prompt):
+        ...
+
+    async def ainvoke(self, prompt):
+        return await asyncio.to_thread(self.invoke, prompt)
+
+    def close(self):
+        pass
+
+
+class GeminiProvider(LLMProvider):
+    """Gemini through LangChain's ChatGoogleGenerativeAI (the default backend)."""
+
+    def __init__(self, api_key, model=GEMINI_MODEL, timeout=None):
+        import google.generativeai as genai
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        # Configure genai to use REST transport instead of gRPC to avoid SSL certificate issues
+        genai.configure(api_key=api_key, transport="rest")
+
+        self.client = ChatGoogleGenerativeAI(
+            model=model,
+            temperature=0,
+            api_key=api_key,
+            transport="rest",
+            timeout=timeout if timeout is not None else llm_timeout()
+        )
+
+    def invoke(self, prompt):
+        return self.client.invoke(prompt)
+
+    async def ainvoke(self, prompt):
+        return await self.client.ainvoke(prompt)
+
+
+_BATCH_ITEM_RE = re.compile(r"^(\d+)\. (.*)$", re.MULTILINE)
+
+
+class FakeLLM(LLMProvider):
+    """Deterministic in-process stand-in for Gemini.
+
+    Answers single and batched intent prompts with the local rule classifier
+    (anything it can't place is a product_inquiry), after an optional fixed
+    ``latency`` plus ``per_item`` seconds per classified message.
+    """
+
+    def __init__(self, latency=0.0, per_item=0.0):
+        self.latency = latency
+        self.per_item = per_item
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.calls += 1
+        content, items = fake_completion(prompt)
+        if self.latency or self.per_item:
+            time.sleep(self.latency + self.per_item * items)
+        return LLMResponse(content)
+
+    async def ainvoke(self, prompt):
+        with self._lock:
+            self.calls += 1
+        content, items = fake_completion(prompt)
+        if self.latency or self.per_item:
+            await asyncio.sleep(self.latency + self.per_item * items)
+        return LLMResponse(content)
+
+
+def fake_completion(prompt):
+    # Returns (completion text, number of messages classified)
+    from agent.intent_rules import classify_by_rules
+
+    if "User messages:" in prompt:
+        items = _BATCH_ITEM_RE.findall(prompt.split("User messages:", 1)[1])
+        lines = [f"{n}: {classify_by_rules(m) or 'product_inquiry'}" for n, m in items]
+        return "\n".join(lines), len(items)
+    if "User message:" in prompt:
+        message = prompt.split("User message:", 1)[1].split("\n\n", 1)[0].strip()
+        return classify_by_rules(message) or "product_inquiry", 1
+    return "product_inquiry", 1
+
+
+def _api_key():
+    # Get API key from environment
+    api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY or GEMINI_API_KEY must be set in .env file or environment")
+    return api_key
+
+
+def create_llm(backend=None):
+    # LLM_BACKEND selects the provider:
+    #   gemini       LangChain ChatGoogleGenerativeAI (default)
+    #   gemini-http  Gemini REST API over a pooled keep-alive HTTP client
+    #   stub         the same HTTP client against a local stub server (LLM_STUB_URL)
+    #   fake         deterministic in-process FakeLLM (FAKE_LLM_LATENCY_MS)
+    load_environment()
+    backend = (backend or os.getenv("LLM_BACKEND", "gemini")).lower()
+    if backend == "gemini":
+        return GeminiProvider(_api_key())
+    if backend == "gemini-http":
+        from agent.llm_http import GeminiHTTPProvider
+        return GeminiHTTPProvider(api_key=_api_key(), timeout=llm_timeout())
+    if backend == "stub":
+        from agent.llm_http import GeminiHTTPProvider
+        url = os.getenv("LLM_STUB_URL", "http://127.0.0.1:8090")
+        return GeminiHTTPProvider(base_url=url, api_key="stub", timeout=llm_timeout())
+    if backend == "fake":
+        return FakeLLM(latency=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")) / 1000)
+    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+
+
+def get_llm():
+    # The Google SDKs are slow to import and the client needs an API key, so
+    # both are deferred until the first message that actually needs Gemini.
+    # Double-checked locking makes concurrent first calls build one client.
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = create_llm()
+    return _llm
+
+
+def built_llm():
+    # The provider if get_llm() already built it, else None (never builds)
+    return _llm
+
+
+def set_llm(provider):
+    # Swap the process-wide provider (benchmarks, load tests); returns the old one
+    global _llm
+    with _llm_lock:
+        previous, _llm = _llm, provider
+    return previous
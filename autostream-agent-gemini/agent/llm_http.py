@@ -0,0 +1,112 @@
+import http.client
+import json
+import queue
+import threading
+from urllib.parse import urlsplit
+
+from agent.llm import GEMINI_MODEL, LLMProvider, LLMResponse, llm_timeout
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com"
+# Socket timeout (seconds) of pooled connections; the Gemini provider passes
+# LLM_TIMEOUT instead
+DEFAULT_HTTP_TIMEOUT = 10.0
+
+
+class LLMHTTPError(RuntimeError):
+    def __init__(self, status, body):
+        super().__init__(f"LLM backend returned HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+
+
+class HTTPConnectionPool:
+    """Fixed-size pool of keep-alive connections to one host.
+
+    Connections are reused across calls instead of a new TCP/TLS handshake per
+    request. A connection the server has closed is replaced and the request
+    retried once.
+    """
+
+    def __init__(self, base_url, size=10, timeout=DEFAULT_HTTP_TIMEOUT):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.created = 0
+
+    def _connect(self):
+        self.created += 1
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        # Returns (status, response body bytes)
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn, reused = self._connect(), False
+            try:
+                try:
+                    status, data = self._send(conn, method, path, body, headers)
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    if not reused:
+                        raise
+                    # Stale keep-alive connection: reconnect and retry once
+                    conn.close()
+                    conn = self._connect()
+                    status, data = self._send(conn, method, path, body, headers)
+            except Exception:
+                conn.close()
+                raise
+            self._idle.put(conn)
+            return status, data
+
+    @staticmethod
+    def _send(conn, method, path, body, headers):
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, response.read()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class GeminiHTTPProvider(LLMProvider):
+    """Calls the Gemini ``generateContent`` REST endpoint over pooled connections.
+
+    Also used for load tests against ``agent.llm_stub``, which serves the same API.
+    """
+
+    def __init__(self, base_url=GEMINI_API_URL, api_key=None, model=GEMINI_MODEL,
+                 pool_size=10, timeout=None):
+        if timeout is None:
+            timeout = llm_timeout()
+        self.pool = HTTPConnectionPool(base_url, size=pool_size, timeout=timeout)
+        self.path = f"/v1beta/models/{model}:generateContent"
+        self.headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        if api_key:
+            self.headers["x-goog-api-key"] = api_key
+
+    def invoke(self, prompt):
+        body = json.dumps({
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {"temperature": 0},
+        })
+        status, data = self.pool.request("POST", self.path, body=body, headers=self.headers)
+        if status >= 400:
+            raise LLMHTTPError(status, data.decode("utf-8", "replace"))
+        payload = json.loads(data)
+        parts = payload["candidates"][0]["content"]["parts"]
+        return LLMResponse("".join(part.get("text", "") for part in parts))
+
+    def close(self):
+        self.pool.close()
@@ -0,0 +1,100 @@
+"""Local HTTP stub of the Gemini generateContent API for offline load tests.
+
+Run:  python -m agent.llm_stub --port 8090 --latency-ms 80 --jitter-ms 20 --error-rate 0.01
+Then: LLM_BACKEND=stub LLM_STUB_URL=http://127.0.0.1:8090 python main.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agent.llm import fake_completion
+
+_PATH_RE = re.compile(r"^/v1beta/models/[^/:]+:generateContent")
+
+
+class StubConfig:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, error_status=503, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so client connection pooling is exercised
+    # Headers and body are written separately; without TCP_NODELAY, Nagle plus
+    # delayed ACKs add tens of ms to every response on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        config = self.server.config
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not _PATH_RE.match(self.path):
+            return self._reply(404, {"error": {"message": "not found"}})
+
+        with config.lock:
+            config.requests += 1
+            delay = max(0.0, config.latency_ms + config.random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+            fail = config.random.random() < config.error_rate
+            if fail:
+                config.errors += 1
+        time.sleep(delay)
+        if fail:
+            return self._reply(config.error_status, {"error": {"message": "injected error"}})
+
+        prompt = "".join(part.get("text", "") for part in json.loads(body)["contents"][-1]["parts"])
+        text, _ = fake_completion(prompt)
+        self._reply(200, {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]})
+
+    def do_GET(self):
+        # GET /stats -> request and injected-error counts
+        config = self.server.config
+        self._reply(200, {"requests": config.requests, "errors": config.errors})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host="127.0.0.1", port=0, **config):
+    # Starts the stub on a background thread; returns (server, base_url).
+    # Call server.shutdown() to stop it.
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.config = StubConfig(**config)
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    server.config = StubConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status)
+    print(f"LLM stub listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
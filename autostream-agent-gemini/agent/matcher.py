@@ -0,0 +1,115 @@
+import re
+
+# Routing vocabularies shared by graph.py and rag.py. Matching is on whole
+# words, so "ty" no longer fires inside "party" or "my" inside "economy".
+# The last word of each phrase also matches its common inflections
+# ("plans", "refunded", "differences").
+VOCABULARIES = {
+    # graph.py: questions asked while lead details are being collected
+    "question": [
+        "why", "what", "how", "when", "where", "who", "which",
+        "what's", "how's", "when's", "where's", "who's",
+        "do you need", "do you ask", "do you want", "do you require",
+        "need my", "ask for", "want my", "require my", "why do", "why did",
+    ],
+    # graph.py: questions about why lead details were collected
+    "why": ["why", "what for", "purpose", "reason"],
+    "details": [
+        "details", "information", "data", "my", "you need", "you ask", "you collect",
+        "you require", "you want", "you needed", "you asked", "you collected",
+    ],
+    "what_does": ["what does", "what do"],
+    "this_that": ["that", "this"],
+    "lead_question": ["why these", "why my", "what about my", "what will you do", "what happens to"],
+    "gratitude": [
+        "thanks", "thank you", "thank", "thankyou", "thank u", "appreciate", "grateful",
+        "ty", "tysm", "thx",
+    ],
+    # rag.py
+    "about_autostream": [
+        "what is autostream", "what's autostream", "what does autostream",
+        "tell me about autostream", "describe autostream", "explain autostream",
+    ],
+    "explain": ["what", "what's", "tell me", "describe", "explain"],
+    "autostream": ["autostream"],
+    "comparison": [
+        "difference", "compare", "comparison", "both plans", "two plans",
+        "all plans", "each plan", "versus", "vs", "which plan",
+    ],
+    "pro": ["pro", "professional", "premium"],
+    "basic": ["basic", "starter", "standard"],
+    "pricing": ["plan", "price", "pricing", "cost", "subscription", "monthly", "fee"],
+    "info": ["tell me", "about", "information", "details", "what is", "what's"],
+    "policy": [
+        "policy", "policies", "refund", "money back", "cancel", "cancelled", "cancelling",
+        "cancellation", "support",
+    ],
+    "refund": ["refund", "money back", "cancel", "cancelled", "cancelling", "cancellation"],
+    "support": ["support"],
+    "capability_question": ["what can", "what do", "how can", "how do"],
+    "features": [
+        "feature", "what can", "capabilities", "do", "offer", "provide", "provides",
+        "include", "includes", "service", "services",
+    ],
+    "help": [
+        "what can you help", "what can you do", "what do you do",
+        "how can you help", "what are you", "what services",
+    ],
+}
+
+_SUFFIXES = ("", "s", "es", "d", "ed", "ing")
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower().replace("’", "'"))
+
+
+class KeywordMatcher:
+    """Matches many phrase vocabularies against a message in one pass.
+
+    Phrases are compiled once into a trie over word tokens. ``match`` walks the
+    message's tokens a single time and returns every category with at least one
+    phrase present, including overlapping ones ("what is autostream" hits
+    ``about_autostream``, ``explain`` and ``autostream`` together).
+    """
+
+    def __init__(self, vocabularies):
+        self._root = {}
+        self._depth = 0
+        for category, phrases in vocabularies.items():
+            for phrase in phrases:
+                self._add(tokenize(phrase), category)
+
+    def _add(self, tokens, category):
+        self._depth = max(self._depth, len(tokens))
+        node = self._root
+        for token in tokens[:-1]:
+            node = node.setdefault(token, ({}, set()))[0]
+        for suffix in _SUFFIXES:
+            node.setdefault(tokens[-1] + suffix, ({}, set()))[1].add(category)
+
+    def match(self, text):
+        return self.match_tokens(tokenize(text))
+
+    def match_tokens(self, tokens):
+        found = set()
+        root = self._root
+        n = len(tokens)
+        for i in range(n):
+            node = root
+            for j in range(i, min(i + self._depth, n)):
+                entry = node.get(tokens[j])
+                if entry is None:
+                    break
+                node, categories = entry
+                if categories:
+                    found |= categories
+        return found
+
+
+ROUTING_MATCHER = KeywordMatcher(VOCABULARIES)
+
+
+def match_categories(text):
+    return ROUTING_MATCHER.match(text)
@@ -1,70 +1,216 @@
-
+import hashlib
 import json
+import os
+import sys
+import threading
 from pathlib import Path
 
-def load_knowledge():
-    # Get the project root directory (parent of 'agent' folder)
-    project_root = Path(__file__).parent.parent
-    kb_path = project_root / "data" / "knowledge_base.json"
-    with open(kb_path) as f:
-        return json.load(f)
-
-def retrieve_answer(query: str, conversation_history=None) -> str:
-    kb = load_knowledge()
-    q = query.lower()
-    
-    # Check for questions about what AutoStream is
-    is_about_autostream = (
-        any(phrase in q for phrase in [
-            "what is autostream", "what's autostream", "what does autostream",
-            "tell me about autostream", "describe autostream", "explain autostream"
-        ]) or
-        (any(word in q for word in ["what", "tell me", "describe", "explain"]) and "autostream" in q)
+from agent.matcher import match_categories
+from agent.retrieval import get_retriever
+
+# Get the project root directory (parent of 'agent' folder)
+project_root = Path(__file__).parent.parent
+KB_PATH = project_root / "data" / "knowledge_base.json"
+
+
+HELP_ANSWER = (
+    "I can help you with:\n"
+    "• Information about AutoStream's pricing plans (Basic and Pro)\n"
+    "• Details about our video editing features and capabilities\n"
+    "• Company policies (refunds, support)\n"
+    "• Signing up for an AutoStream account\n\n"
+    "What would you like to know more about?"
+)
+
+CLARIFY_ANSWER = (
+    "I can help you with pricing plans, refund policies, and support information. "
+    "Could you please clarify your question?"
+)
+
+
+def render_answers(kb):
+    # Compile every answer variant for this knowledge base, keyed by
+    # (answer kind, plan, policy); classify_query picks the key per message
+    basic = kb['pricing']['basic']
+    pro = kb['pricing']['pro']
+    policies = kb['policies']
+    pro_features = ', '.join(pro.get('features', []))
+    includes = f"- Includes: {', '.join(pro['features'])}\n" if 'features' in pro else ""
+
+    basic_block = (
+        f"**Basic Plan:** {basic['price']}\n"
+        f"- {basic['videos']}\n"
+        f"- {basic['resolution']} resolution\n"
     )
-    
-    if is_about_autostream:
-        basic = kb['pricing']['basic']
-        pro = kb['pricing']['pro']
-        return (
+    pro_block = (
+        f"**Pro Plan:** {pro['price']}\n"
+        f"- {pro['videos']} videos\n"
+        f"- {pro['resolution']} resolution\n"
+    ) + includes
+
+    pro_includes = (
+        f"The Pro Plan includes:\n"
+        f"- {pro['videos']} videos\n"
+        f"- {pro['resolution']} resolution\n"
+    )
+    if 'features' in pro:
+        pro_includes += f"- {', '.join(pro['features'])}\n"
+    pro_includes += f"\nPrice: {pro['price']}"
+
+    answers = {
+        ("about", None, None): (
             "AutoStream is a SaaS product that provides automated video editing tools for content creators. "
             "We help creators edit their videos efficiently with features like:\n\n"
             f"**Our Plans:**\n"
             f"- **Basic Plan** ({basic['price']}): {basic['videos']}, {basic['resolution']} resolution\n"
             f"- **Pro Plan** ({pro['price']}): {pro['videos']} videos, {pro['resolution']} resolution, "
-            f"{', '.join(pro.get('features', []))}\n\n"
+            f"{pro_features}\n\n"
             "Would you like to know more about our pricing plans or specific features?"
-        )
+        ),
+        ("policy", "pro", None): (
+            f"**Pro Plan Policies:**\n"
+            f"- Refund: {policies['refund']}\n"
+            f"- Support: {policies['support']}"
+        ),
+        ("policy", "basic", None): (
+            f"**Basic Plan Policies:**\n"
+            f"- Refund: {policies['refund']}\n"
+            f"- Support: 24/7 support is only available on the Pro plan"
+        ),
+        ("policy", None, "refund"): f"Our refund policy: {policies['refund']}",
+        ("policy", None, "support"): f"Support information: {policies['support']}",
+        ("policy", None, None): (
+            f"**Company Policies:**\n"
+            f"- Refund Policy: {policies['refund']}\n"
+            f"- Support: {policies['support']}"
+        ),
+        ("comparison", None, None): (
+            "Here's a comparison of our plans:\n\n"
+            + basic_block + "\n" + pro_block +
+            f"\n**Key Differences:**\n"
+            f"- Pro Plan offers unlimited videos vs Basic's 10 videos/month\n"
+            f"- Pro Plan has 4K resolution vs Basic's 720p\n"
+            f"- Pro Plan includes AI captions (not available in Basic)"
+        ),
+        ("pricing", "pro", None): pro_block,
+        ("pricing", "basic", None): basic_block,
+        ("pricing", None, None): "Here are our pricing plans:\n\n" + basic_block + "\n" + pro_block,
+        ("features", "pro", None): pro_includes,
+        ("features", "basic", None): (
+            f"The Basic Plan includes:\n"
+            f"- {basic['videos']}\n"
+            f"- {basic['resolution']} resolution\n"
+            f"\nPrice: {basic['price']}"
+        ),
+        ("features", None, None): (
+            "AutoStream is a video editing SaaS platform that helps content creators edit their videos. "
+            "We offer two plans:\n\n"
+            f"**Basic Plan** ({basic['price']}): {basic['videos']}, {basic['resolution']} resolution\n"
+            f"**Pro Plan** ({pro['price']}): {pro['videos']} videos, {pro['resolution']} resolution, "
+            f"{pro_features}\n\n"
+            "Would you like to know more about a specific plan?"
+        ),
+        ("help", None, None): HELP_ANSWER,
+    }
+    # Interned, so every reply of one variant is the same string object
+    return {key: sys.intern(text) for key, text in answers.items()}
+
+
+class KnowledgeBase:
+    """Process-wide view of knowledge_base.json.
+
+    The file is parsed once and its answer variants rendered once per content
+    version (``answers``, see render_answers). Each access only stats the
+    file; it is re-read when mtime/size change and re-parsed (and the answers
+    re-rendered) only if the content hash actually differs.
+    """
+
+    def __init__(self, path=KB_PATH):
+        self.path = Path(path)
+        self.data = None
+        self.answers = {}
+        self.version = 0
+        self._stamp = None
+        self.digest = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        st = os.stat(self.path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return self
+        with self._lock:
+            if stamp == self._stamp:
+                return self
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest != self.digest:
+                data = json.loads(raw)
+                self.answers = render_answers(data)
+                self.data = data
+                self.digest = digest
+                self.version += 1
+            self._stamp = stamp
+        return self
+
+
+_knowledge_base = KnowledgeBase()
+
+
+def get_knowledge_base():
+    return _knowledge_base.refresh()
+
+
+def load_knowledge():
+    return get_knowledge_base().data
+
+
+def classify_query(query, conversation_history=None, context=None):
+    # Maps a query to the key of its rendered answer, or None when no routing
+    # rule applies and the knowledge base passages should be searched.
+    # context: the conversation's ConversationContext, with query as its latest
+    # user message; its precomputed features replace rescanning the history.
+    # Every routing vocabulary is matched in a single pass over the query
+    matched = context.user_categories if context is not None else match_categories(query)
+    
+    # Check for questions about what AutoStream is
+    is_about_autostream = (
+        "about_autostream" in matched or
+        ("explain" in matched and "autostream" in matched)
+    )
+    
+    if is_about_autostream:
+        return ("about", None, None)
     
     # Check for comparison/difference requests FIRST (these should always return both plans)
-    is_comparison_request = any(phrase in q for phrase in [
-        "difference", "compare", "comparison", "both plans", "two plans", 
-        "all plans", "each plan", "versus", "vs", "which plan"
-    ])
+    is_comparison_request = "comparison" in matched
     
-    # Check for specific plan mentions in CURRENT query (use word boundaries to avoid partial matches)
-    # Split query into words to avoid matching "basic" inside "difference"
-    q_words = q.split()
-    is_pro_plan_current = any(word in ["pro", "professional", "premium"] for word in q_words) or \
-                         any(phrase in q for phrase in ["pro plan", "professional plan", "premium plan"])
-    is_basic_plan_current = any(word in ["basic", "starter", "standard"] for word in q_words) or \
-                           any(phrase in q for phrase in ["basic plan", "starter plan", "standard plan"])
+    # Check for specific plan mentions in CURRENT query (whole words only, so
+    # "basic" isn't found inside "difference")
+    is_pro_plan_current = "pro" in matched
+    is_basic_plan_current = "basic" in matched
     
     # Only use conversation history if current query is ambiguous but related to plans
     # AND doesn't explicitly mention a plan
     use_history_for_plans = (
-        conversation_history and 
+        (conversation_history or context is not None) and 
         not is_pro_plan_current and 
         not is_basic_plan_current and
-        any(word in q for word in ["plan", "price", "pricing", "cost", "subscription", "monthly", "fee"])
+        "pricing" in matched
     )
     
-    if use_history_for_plans:
+    if use_history_for_plans and context is not None:
+        # Plans the user mentioned in the last few turns, tracked as they happened
+        recent_plans = context.recent_plans()
+        is_pro_plan = "pro" in recent_plans
+        is_basic_plan = "basic" in recent_plans
+    elif use_history_for_plans:
         # Look through recent conversation for plan mentions
-        recent_context = " ".join([msg for role, msg in conversation_history[-6:] if role == "user"]).lower()
-        is_pro_plan_history = any(word in recent_context for word in ["pro", "professional", "premium"])
-        is_basic_plan_history = any(word in recent_context for word in ["basic", "starter", "standard"])
-        is_pro_plan = is_pro_plan_history
-        is_basic_plan = is_basic_plan_history
+        recent_context = " ".join([msg for role, msg in conversation_history[-6:] if role == "user"])
+        recent_matched = match_categories(recent_context)
+        is_pro_plan = "pro" in recent_matched
+        is_basic_plan = "basic" in recent_matched
     else:
         # Use current query only
         is_pro_plan = is_pro_plan_current
@@ -73,147 +219,71 @@ def retrieve_answer(query: str, conversation_history=None) -> str:
     # Check for general inquiries about plans (tell me about, information about, etc.)
     is_general_plan_inquiry = (
         (is_pro_plan_current or is_basic_plan_current) and
-        any(phrase in q for phrase in ["tell me", "about", "information", "details", "what is", "what's"])
+        "info" in matched
     )
     
     # Policy inquiries - check BEFORE plan inquiries to handle "policy on this plan" questions
-    is_policy_inquiry = any(word in q for word in ["policy", "policies", "refund", "money back", "cancel", "cancellation", "support"])
+    is_policy_inquiry = "policy" in matched
     
     if is_policy_inquiry:
         # Check if asking about policy for a specific plan
         if is_pro_plan_current:
-            return (
-                f"**Pro Plan Policies:**\n"
-                f"- Refund: {kb['policies']['refund']}\n"
-                f"- Support: {kb['policies']['support']}"
-            )
+            return ("policy", "pro", None)
         elif is_basic_plan_current:
-            return (
-                f"**Basic Plan Policies:**\n"
-                f"- Refund: {kb['policies']['refund']}\n"
-                f"- Support: 24/7 support is only available on the Pro plan"
-            )
-        elif "refund" in q or "money back" in q or "cancel" in q or "cancellation" in q:
-            return f"Our refund policy: {kb['policies']['refund']}"
-        elif "support" in q and not any(phrase in q for phrase in ["what can", "what do", "how can", "how do"]):
-            return f"Support information: {kb['policies']['support']}"
+            return ("policy", "basic", None)
+        elif "refund" in matched:
+            return ("policy", None, "refund")
+        elif "support" in matched and "capability_question" not in matched:
+            return ("policy", None, "support")
         else:
             # General policy question
-            return (
-                f"**Company Policies:**\n"
-                f"- Refund Policy: {kb['policies']['refund']}\n"
-                f"- Support: {kb['policies']['support']}"
-            )
+            return ("policy", None, None)
     
     # Pricing/plan inquiries
-    if any(word in q for word in ["price", "pricing", "plan", "cost", "subscription", "monthly", "fee"]) or is_comparison_request or is_general_plan_inquiry:
+    if "pricing" in matched or is_comparison_request or is_general_plan_inquiry:
         # If asking for comparison, always return both plans
         if is_comparison_request:
-            basic = kb['pricing']['basic']
-            pro = kb['pricing']['pro']
-            response = (
-                f"Here's a comparison of our plans:\n\n"
-                f"**Basic Plan:** {basic['price']}\n"
-                f"- {basic['videos']}\n"
-                f"- {basic['resolution']} resolution\n\n"
-                f"**Pro Plan:** {pro['price']}\n"
-                f"- {pro['videos']} videos\n"
-                f"- {pro['resolution']} resolution\n"
-            )
-            if 'features' in pro:
-                response += f"- Includes: {', '.join(pro['features'])}\n"
-            response += (
-                f"\n**Key Differences:**\n"
-                f"- Pro Plan offers unlimited videos vs Basic's 10 videos/month\n"
-                f"- Pro Plan has 4K resolution vs Basic's 720p\n"
-                f"- Pro Plan includes AI captions (not available in Basic)"
-            )
-            return response
+            return ("comparison", None, None)
         # If user asks about a specific plan, return only that plan
         elif is_pro_plan and not is_basic_plan:
-            pro = kb['pricing']['pro']
-            response = (
-                f"**Pro Plan:** {pro['price']}\n"
-                f"- {pro['videos']} videos\n"
-                f"- {pro['resolution']} resolution\n"
-            )
-            if 'features' in pro:
-                response += f"- Includes: {', '.join(pro['features'])}\n"
-            return response
+            return ("pricing", "pro", None)
         elif is_basic_plan and not is_pro_plan:
-            basic = kb['pricing']['basic']
-            response = (
-                f"**Basic Plan:** {basic['price']}\n"
-                f"- {basic['videos']}\n"
-                f"- {basic['resolution']} resolution\n"
-            )
-            return response
+            return ("pricing", "basic", None)
         else:
             # User asked about plans in general, return both
-            basic = kb['pricing']['basic']
-            pro = kb['pricing']['pro']
-            response = (
-                f"Here are our pricing plans:\n\n"
-                f"**Basic Plan:** {basic['price']}\n"
-                f"- {basic['videos']}\n"
-                f"- {basic['resolution']} resolution\n\n"
-                f"**Pro Plan:** {pro['price']}\n"
-                f"- {pro['videos']} videos\n"
-                f"- {pro['resolution']} resolution\n"
-            )
-            if 'features' in pro:
-                response += f"- Includes: {', '.join(pro['features'])}\n"
-            return response
+            return ("pricing", None, None)
 
 
     # Feature inquiries - general questions about what the service provides
-    if any(word in q for word in ["feature", "what can", "capabilities", "do", "offer", "provide", "provides", "include", "includes", "service", "services"]):
+    if "features" in matched:
         # Only return specific plan if explicitly mentioned in CURRENT query
         # General questions like "what do you provide?" should get general answer
         if is_pro_plan_current:
-            pro = kb['pricing']['pro']
-            response = (
-                f"The Pro Plan includes:\n"
-                f"- {pro['videos']} videos\n"
-                f"- {pro['resolution']} resolution\n"
-            )
-            if 'features' in pro:
-                response += f"- {', '.join(pro['features'])}\n"
-            response += f"\nPrice: {pro['price']}"
-            return response
+            return ("features", "pro", None)
         elif is_basic_plan_current:
-            basic = kb['pricing']['basic']
-            response = (
-                f"The Basic Plan includes:\n"
-                f"- {basic['videos']}\n"
-                f"- {basic['resolution']} resolution\n"
-                f"\nPrice: {basic['price']}"
-            )
-            return response
+            return ("features", "basic", None)
         else:
             # General question - provide overview of the service
-            basic = kb['pricing']['basic']
-            pro = kb['pricing']['pro']
-            response = (
-                "AutoStream is a video editing SaaS platform that helps content creators edit their videos. "
-                "We offer two plans:\n\n"
-                f"**Basic Plan** ({basic['price']}): {basic['videos']}, {basic['resolution']} resolution\n"
-                f"**Pro Plan** ({pro['price']}): {pro['videos']} videos, {pro['resolution']} resolution, "
-                f"{', '.join(pro.get('features', []))}\n\n"
-                "Would you like to know more about a specific plan?"
-            )
-            return response
+            return ("features", None, None)
 
     # General capability questions
-    if any(phrase in q for phrase in ["what can you help", "what can you do", "what do you do", 
-                                      "how can you help", "what are you", "what services"]):
-        return (
-            "I can help you with:\n"
-            "• Information about AutoStream's pricing plans (Basic and Pro)\n"
-            "• Details about our video editing features and capabilities\n"
-            "• Company policies (refunds, support)\n"
-            "• Signing up for an AutoStream account\n\n"
-            "What would you like to know more about?"
-        )
+    if "help" in matched:
+        return ("help", None, None)
+    
+    return None
+
+
+def retrieve_answer(query: str, conversation_history=None, context=None) -> str:
+    kb = get_knowledge_base()
+    key = classify_query(query, conversation_history, context)
+    if key is not None:
+        return kb.answers[key]
+
+    # Nothing matched the routing rules: search the knowledge base passages
+    # (JSON plus optional data/kb/*.md files) and answer with the best hits
+    hits = get_retriever(kb).search(query, k=2)
+    if hits:
+        best = hits[0][0]
+        return "\n\n".join(passage.text for score, passage in hits if score >= 0.5 * best)
     
-    return "I can help you with pricing plans, refund policies, and support information. Could you please clarify your question?"
+    return CLARIFY_ANSWER
@@ -0,0 +1,338 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+
+from agent.matcher import tokenize
+
+project_root = Path(__file__).parent.parent
+KB_DIR = project_root / "data" / "kb"
+INDEX_PATH = project_root / "data" / "index" / "retrieval.json"
+# Bump when chunking or index layout changes so persisted indexes are rebuilt
+INDEX_VERSION = 1
+
+STOPWORDS = frozenset(
+    "a an and are about any as at be by can could do does for from have how i i'm if in is it "
+    "its me my of on or our please the their there this to us was we what what's when where which "
+    "who why will with would you your".split()
+)
+
+
+# NumPy is optional: with it, BM25 scoring and the hashing embedder are
+# vectorized; without it, BM25 falls back to pure-Python postings. It is
+# imported on the first passage search, not when agent.graph is imported.
+_np = False
+
+
+def _numpy():
+    global _np
+    if _np is False:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - depends on the environment
+            numpy = None
+        _np = numpy
+    return _np
+
+
+def _terms(text):
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+class Passage:
+    __slots__ = ("id", "source", "title", "text")
+
+    def __init__(self, id, source, title, text):
+        self.id = id
+        self.source = source
+        self.title = title
+        self.text = text
+
+    def to_dict(self):
+        return {"id": self.id, "source": self.source, "title": self.title, "text": self.text}
+
+    def __repr__(self):
+        return f"Passage({self.id!r})"
+
+
+def chunk_knowledge_base(kb, source="knowledge_base.json"):
+    # One passage per innermost object (a plan, the policy set, an FAQ entry),
+    # so new plans or sections in the JSON become retrievable without code changes
+    passages = []
+
+    def walk(node, path):
+        if isinstance(node, dict):
+            leaves = {k: v for k, v in node.items() if not isinstance(v, (dict, list)) or _is_scalar_list(v)}
+            if leaves:
+                title = " ".join(path).replace("_", " ").title() if path else "AutoStream"
+                body = "\n".join(f"- {k.replace('_', ' ').capitalize()}: {_render(v)}" for k, v in leaves.items())
+                passages.append(Passage(".".join(path) or "root", source, title, f"**{title}**\n{body}"))
+            for key, value in node.items():
+                if key not in leaves:
+                    walk(value, path + [key])
+        elif isinstance(node, list):
+            for i, item in enumerate(node):
+                walk(item, path + [str(i)])
+
+    walk(kb, [])
+    return passages
+
+
+def load_markdown_passages(directory=KB_DIR):
+    # Optional FAQ/docs: every "#"-heading section of data/kb/*.md is a passage
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    passages = []
+    for path in sorted(directory.glob("*.md")):
+        title, lines = path.stem.replace("_", " ").title(), []
+
+        def flush():
+            text = "\n".join(lines).strip()
+            if text:
+                passages.append(Passage(f"{path.name}#{len(passages)}", path.name, title, f"**{title}**\n{text}"))
+
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    flush()
+                    title, lines = line.lstrip("#").strip(), []
+                else:
+                    lines.append(line.rstrip())
+        flush()
+    return passages
+
+
+def _is_scalar_list(value):
+    return isinstance(value, list) and all(not isinstance(v, (dict, list)) for v in value)
+
+
+def _render(value):
+    return ", ".join(str(v) for v in value) if isinstance(value, list) else str(value)
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index.
+
+    A query only touches the postings of its own terms, so latency tracks the
+    number of matching passages rather than the size of the knowledge base.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> ([doc ids], [term frequencies])
+        self.doc_lengths = []
+        self.avg_length = 0.0
+        self._arrays = None
+
+    def build(self, texts):
+        for doc_id, text in enumerate(texts):
+            counts = Counter(_terms(text))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                ids, tfs = self.postings.setdefault(term, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        return self
+
+    def _idf(self, df):
+        n = len(self.doc_lengths)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def scores(self, query):
+        # Returns {doc_id: score} for docs sharing at least one term with the query
+        terms = set(_terms(query))
+        np = _numpy()
+        if np is not None:
+            return self._scores_numpy(terms, np)
+        k1, b, avg = self.k1, self.b, self.avg_length or 1.0
+        scores = {}
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            idf = self._idf(len(posting[0]))
+            for doc_id, tf in zip(*posting):
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_id] / avg)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+    def _scores_numpy(self, terms, np):
+        if self._arrays is None:
+            self._arrays = (
+                {t: (np.asarray(ids, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+                 for t, (ids, tfs) in self.postings.items()},
+                np.asarray(self.doc_lengths, dtype=np.float32),
+            )
+        postings, lengths = self._arrays
+        scores = np.zeros(len(lengths), dtype=np.float32)
+        k1, b, avg = self.k1, self.b, self.avg_length or 1.0
+        for term in terms:
+            posting = postings.get(term)
+            if posting is None:
+                continue
+            ids, tfs = posting
+            norm = k1 * (1 - b + b * lengths[ids] / avg)
+            scores[ids] += self._idf(len(ids)) * tfs * (k1 + 1) / (tfs + norm)
+        hits = np.flatnonzero(scores)
+        return dict(zip(hits.tolist(), scores[hits].tolist()))
+
+    def to_dict(self):
+        return {"k1": self.k1, "b": self.b, "postings": self.postings, "doc_lengths": self.doc_lengths}
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data["k1"], data["b"])
+        index.postings = {t: (p[0], p[1]) for t, p in data["postings"].items()}
+        index.doc_lengths = data["doc_lengths"]
+        index.avg_length = (sum(index.doc_lengths) / len(index.doc_lengths)) if index.doc_lengths else 0.0
+        return index
+
+
+class HashingEmbedder:
+    """Stateless local embedder: hashed word and character-trigram features.
+
+    Needs no model download or training, so embeddings can be rebuilt whenever
+    the knowledge base changes. Requires NumPy.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def _features(self, text):
+        terms = _terms(text)
+        features = list(terms)
+        for term in terms:
+            padded = f"#{term}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, texts):
+        np = _numpy()
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class Retriever:
+    """Top-k passage search over the knowledge base (BM25, plus dense if NumPy is present)."""
+
+    def __init__(self, passages, bm25=None, dense_weight=0.3):
+        self.passages = passages
+        self.bm25 = bm25 or BM25Index().build([p.text for p in passages])
+        self.dense_weight = dense_weight
+        self.embedder = HashingEmbedder() if _numpy() is not None else None
+        self.embeddings = self.embedder.embed([p.text for p in passages]) if self.embedder else None
+
+    def search(self, query, k=3):
+        scores = self.bm25.scores(query)
+        if not scores:
+            return []
+        if self.embeddings is not None and len(scores) > 1:
+            # Rescale BM25 to [0, 1] and blend in cosine similarity for the candidates
+            np = _numpy()
+            top = max(scores.values())
+            ids = np.fromiter(scores.keys(), dtype=np.int64)
+            cosine = self.embeddings[ids] @ self.embedder.embed([query])[0]
+            blended = (1 - self.dense_weight) * np.fromiter(scores.values(), dtype=np.float32) / top \
+                + self.dense_weight * cosine
+            scores = dict(zip(ids.tolist(), blended.tolist()))
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(score, self.passages[doc_id]) for doc_id, score in best]
+
+    def save(self, path, signature):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "signature": signature,
+                "passages": [p.to_dict() for p in self.passages],
+                "bm25": self.bm25.to_dict(),
+            }, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, signature):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("signature") != signature:
+            return None
+        passages = [Passage(**p) for p in data["passages"]]
+        return cls(passages, BM25Index.from_dict(data["bm25"]))
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class SourceSignature:
+    """Signature of the retrieval sources: the JSON KB digest plus the name,
+    mtime and size of every markdown file.
+
+    Like KnowledgeBase.refresh, a lookup only stats the directory and the
+    files it already knows; the directory is globbed and the signature
+    rehashed only when one of those stamps (or the KB digest) changes.
+    """
+
+    def __init__(self, directory=KB_DIR):
+        self.directory = Path(directory)
+        self._state = ((), None, None)  # (files, stamps key, signature), swapped atomically
+
+    def get(self, kb_digest):
+        files, key, signature = self._state
+        if key == (kb_digest, _stamp(self.directory), tuple(_stamp(path) for path in files)):
+            return signature
+        directory_stamp = _stamp(self.directory)
+        files = tuple(sorted(self.directory.glob("*.md"))) if self.directory.is_dir() else ()
+        stamps = tuple(_stamp(path) for path in files)
+        h = hashlib.sha256(f"{INDEX_VERSION}:{kb_digest}".encode("utf-8"))
+        for path, stamp in zip(files, stamps):
+            if stamp is not None:
+                h.update(f"{path.name}:{stamp[0]}:{stamp[1]}".encode("utf-8"))
+        signature = h.hexdigest()
+        self._state = (files, (kb_digest, directory_stamp, stamps), signature)
+        return signature
+
+
+_source_signature = SourceSignature()
+
+
+_retriever = None
+_retriever_signature = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever(kb):
+    # kb is a refreshed rag.KnowledgeBase; the index is rebuilt (or loaded from
+    # INDEX_PATH) only when the KB content or markdown sources change
+    global _retriever, _retriever_signature
+    signature = _source_signature.get(kb.digest)
+    if signature != _retriever_signature:
+        with _retriever_lock:
+            if signature != _retriever_signature:
+                retriever = Retriever.load(INDEX_PATH, signature)
+                if retriever is None:
+                    retriever = Retriever(chunk_knowledge_base(kb.data) + load_markdown_passages())
+                    retriever.save(INDEX_PATH, signature)
+                _retriever, _retriever_signature = retriever, signature
+    return _retriever
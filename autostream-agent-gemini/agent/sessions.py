@@ -0,0 +1,266 @@
+import json
+import sqlite3
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from pathlib import Path
+
+from agent.context import ConversationContext
+from agent.history import ConversationHistory
+from agent.state import AgentState
+
+project_root = Path(__file__).parent.parent
+DEFAULT_DB_PATH = project_root / "data" / "sessions.db"
+
+_ROLE_CODES = {"user": "u", "assistant": "a"}
+_ROLE_NAMES = {code: role for role, code in _ROLE_CODES.items()}
+
+
+def serialize_state(state):
+    # Compact JSON: short keys, no whitespace, one-letter role codes in history
+    payload = {
+        "i": state.intent,
+        "n": state.name,
+        "e": state.email,
+        "p": state.platform,
+        "c": 1 if state.lead_captured else 0,
+        "h": [[_ROLE_CODES.get(role, role), text] for role, text in state.conversation_history],
+    }
+    context = getattr(state, "context", None)
+    if context is not None:
+        payload["f"] = context.to_list()
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def deserialize_state(data):
+    payload = json.loads(data)
+    history = ConversationHistory((_ROLE_NAMES.get(role, role), text) for role, text in payload.get("h", []))
+    # Sessions saved before context features existed are replayed once
+    if "f" in payload:
+        context = ConversationContext.from_list(payload["f"], history)
+    else:
+        context = ConversationContext.from_history(history)
+    return AgentState(
+        intent=payload.get("i"),
+        name=payload.get("n"),
+        email=payload.get("e"),
+        platform=payload.get("p"),
+        lead_captured=bool(payload.get("c")),
+        conversation_history=history,
+        context=context,
+    )
+
+
+class MemorySessionBackend:
+    """In-process LRU of serialized sessions, capped at ``maxsize`` entries."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # session_id -> (data, updated_at)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+            return entry
+
+    def put_many(self, items):
+        with self._lock:
+            for session_id, entry in items.items():
+                self._entries[session_id] = entry
+                self._entries.move_to_end(session_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def expire(self, cutoff):
+        with self._lock:
+            stale = [sid for sid, (_, updated_at) in self._entries.items() if updated_at < cutoff]
+            for sid in stale:
+                del self._entries[sid]
+            return len(stale)
+
+    def close(self):
+        pass
+
+
+class SQLiteSessionBackend:
+    """SQLite table of serialized sessions; a local stand-in for Redis/Postgres."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions(updated_at)")
+
+    def get(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, updated_at FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return (bytes(row[0]), row[1]) if row else None
+
+    def put_many(self, items):
+        rows = [(sid, data, updated_at) for sid, (data, updated_at) in items.items()]
+        with self._lock:
+            # One transaction per batch instead of one per turn
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO sessions (id, data, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def expire(self, cutoff):
+        with self._lock:
+            return self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SessionStore:
+    """Loads and saves AgentState by session ID over a pluggable backend.
+
+    Saves are write-behind: the state is serialized immediately but written
+    to the backend in batches by a background thread, every ``flush_interval``
+    seconds or as soon as ``flush_batch`` sessions are dirty (with no
+    ``flush_interval`` there is no thread and save flushes inline). Sessions idle
+    for longer than ``ttl`` seconds are treated as new and purged periodically.
+    With a ``transcript`` (TranscriptLog), every loaded session's history also
+    appends its turns there, so turns evicted from the ring buffer are kept.
+    """
+
+    def __init__(self, backend=None, ttl=24 * 3600, flush_interval=0.5, flush_batch=64, transcript=None):
+        self.backend = backend if backend is not None else MemorySessionBackend()
+        self.transcript = transcript
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._dirty = {}
+        self._inflight = {}
+        self._deleted = set()  # sessions deleted while their batch was being written
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._wake = threading.Event()
+        self._last_expire = time.time()
+        self._thread = None
+        if flush_interval:
+            self._thread = threading.Thread(target=self._run, name="session-flusher", daemon=True)
+            self._thread.start()
+
+    def load(self, session_id):
+        with self._lock:
+            # A batch being written is still visible until the backend has it
+            entry = self._dirty.get(session_id) or self._inflight.get(session_id)
+            deleted = session_id in self._deleted
+        if entry is None and not deleted:
+            entry = self.backend.get(session_id)
+        if entry is None or entry[1] < time.time() - self.ttl:
+            state = AgentState()
+        else:
+            state = deserialize_state(entry[0])
+        if self.transcript is not None:
+            state.conversation_history.attach_transcript(self.transcript, session_id)
+        return state
+
+    def save(self, session_id, state):
+        entry = (serialize_state(state), time.time())
+        with self._lock:
+            self._dirty[session_id] = entry
+            full = len(self._dirty) >= self.flush_batch
+        if full:
+            if self._thread is not None:
+                # Hand the write to the flusher; backend errors stay on that path
+                self._wake.set()
+            else:
+                self.flush()
+
+    def delete(self, session_id):
+        with self._lock:
+            self._dirty.pop(session_id, None)
+            if self._inflight.pop(session_id, None) is not None:
+                # The running flush may still write it; the flush deletes it again
+                self._deleted.add(session_id)
+        self.backend.delete(session_id)
+
+    def flush(self):
+        # _flush_lock keeps batches in order so an older batch can't land after a newer one
+        with self._flush_lock:
+            with self._lock:
+                batch, self._dirty = self._dirty, {}
+                self._inflight = dict(batch)
+            try:
+                if batch:
+                    self.backend.put_many(batch)
+            except Exception:
+                # Put the batch back for the next flush; sessions saved since
+                # it was taken are newer and win, deleted ones stay deleted
+                with self._lock:
+                    for session_id, entry in batch.items():
+                        if session_id not in self._deleted:
+                            self._dirty.setdefault(session_id, entry)
+                raise
+            finally:
+                with self._lock:
+                    self._inflight = {}
+                    deleted, self._deleted = self._deleted, set()
+                for session_id in deleted:
+                    self.backend.delete(session_id)
+            return len(batch)
+
+    def expire_idle(self):
+        self._last_expire = time.time()
+        return self.backend.expire(self._last_expire - self.ttl)
+
+    def _run(self):
+        # Runs every flush_interval, or sooner when save() finds a full batch
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._closed.is_set():
+                return
+            # A backend error must not kill the flusher; the failed batch is
+            # retried on the next pass
+            try:
+                self.flush()
+                if self.transcript is not None:
+                    self.transcript.flush()
+                if time.time() - self._last_expire >= min(self.ttl, 60):
+                    self.expire_idle()
+            except Exception:
+                traceback.print_exc()
+
+    def close(self):
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        self.backend.close()
+        if self.transcript is not None:
+            self.transcript.close()
@@ -1,6 +1,6 @@
-
 from dataclasses import dataclass, field
-from typing import List, Tuple
+from agent.context import ConversationContext
+from agent.history import ConversationHistory
 
 @dataclass
 class AgentState:
@@ -9,4 +9,7 @@ class AgentState:
     email: str = None
     platform: str = None
     lead_captured: bool = False
-    conversation_history: List[Tuple[str, str]] = field(default_factory=list)  
+    # Bounded ring buffer of recent (role, text) turns; see agent/history.py
+    conversation_history: ConversationHistory = field(default_factory=ConversationHistory)
+    # Features derived from the conversation, updated once per turn; see agent/context.py
+    context: ConversationContext = field(default_factory=ConversationContext)
@@ -1,7 +1,6 @@
 
-import json
 from datetime import datetime
-from pathlib import Path
+from agent.lead_writer import get_lead_writer
 
 def mock_lead_capture(name, email, platform):
     # Print to stdout so it is clearly visible in logs / demo recordings
@@ -16,36 +15,22 @@ def mock_lead_capture(name, email, platform):
         "status": "Lead captured successfully"
     }
     
-    # Save to leads file
-    project_root = Path(__file__).parent.parent
-    leads_file = project_root / "data" / "leads.json"
-    
-    # Ensure data directory exists
-    leads_file.parent.mkdir(exist_ok=True)
-    
-    # Load existing leads or create new list
-    if leads_file.exists():
-        try:
-            with open(leads_file, 'r') as f:
-                leads = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            leads = []
-    else:
-        leads = []
-    
-    # Append new lead
-    leads.append(lead_data)
-    
-    # Save back to file
-    with open(leads_file, 'w') as f:
-        json.dump(leads, f, indent=2)
-    
-    print(f"Lead saved to {leads_file}")
+    # Queue the lead for the background writer instead of touching disk in
+    # the user's turn; it lands in the lead log within LEAD_FLUSH_MS
+    saved = get_lead_writer().submit(lead_data)
+    saved.add_done_callback(_report_failure)
 
-    # Also return a structured payload for programmatic use
+    # Also return a structured payload for programmatic use. "saved" is the
+    # writer's Future: it resolves once the lead is persisted, or fails after
+    # the writer's retries (the lead is then in the dead-letter file)
     return {
         "name": name,
         "email": email,
         "platform": platform,
-        "status": "Lead captured successfully"
+        "status": "Lead captured successfully",
+        "saved": saved,
     }
+
+def _report_failure(future):
+    if future.exception() is not None:
+        print(f"Lead was NOT saved: {future.exception()!r}")
@@ -0,0 +1,210 @@
+import atexit
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Per-turn tracing. agent_step opens a root "agent_step" span per turn, and
+# the hot paths (routing, detect_intent, retrieve_answer, mock_lead_capture)
+# open timed child spans under it. Finished turns go to the configured sink.
+# With no sink (the default) span() hands back one shared no-op object, so
+# tracing costs a global lookup and a call per span.
+
+_current = contextvars.ContextVar("agent_span", default=None)
+_turn = contextvars.ContextVar("agent_turn_span", default=None)
+_sink = None
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "attributes", "children", "_token", "_turn_token")
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.start = 0.0
+        self.duration = 0.0
+        self.attributes = attributes or {}
+        self.children = []
+        self._token = None
+        self._turn_token = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is not None:
+            parent.children.append(self)
+        else:
+            self._turn_token = _turn.set(self)
+        self._token = _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        _current.reset(self._token)
+        # Only root spans (whole turns) are handed to the sink
+        if self._turn_token is not None:
+            _turn.reset(self._turn_token)
+            if _sink is not None:
+                _sink.emit(self)
+        return False
+
+    def to_dict(self):
+        data = {"name": self.name, "duration_ms": round(self.duration * 1000, 3)}
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name, **attributes):
+    if _sink is None:
+        return _NOOP
+    return Span(name, attributes)
+
+
+def set_attribute(key, value):
+    # Tags the innermost open span
+    if _sink is not None:
+        current = _current.get()
+        if current is not None:
+            current.attributes[key] = value
+
+
+def tag_turn(key, value):
+    # Tags the root span of the current turn (e.g. the routing branch taken)
+    if _sink is not None:
+        turn = _turn.get()
+        if turn is not None:
+            turn.attributes[key] = value
+
+
+def set_sink(sink):
+    # None turns tracing off; returns the previous sink
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
+
+
+def get_sink():
+    return _sink
+
+
+class JSONLSink:
+    """Appends one JSON line per turn (the span tree) to ``path``."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def emit(self, root):
+        record = root.to_dict()
+        record["ts"] = time.time()
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class HistogramSink:
+    """Aggregates span durations into per-span histograms and counts routing
+    branches; ``prometheus_text()`` renders them in Prometheus exposition format.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}  # span name -> [bucket counts..., +Inf count, sum]
+        self._branches = {}
+        self._lock = threading.Lock()
+
+    def emit(self, root):
+        with self._lock:
+            branch = root.attributes.get("branch")
+            if branch is not None:
+                self._branches[branch] = self._branches.get(branch, 0) + 1
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                self._observe(node.name, node.duration)
+                stack.extend(node.children)
+
+    def _observe(self, name, seconds):
+        hist = self._histograms.get(name)
+        if hist is None:
+            hist = self._histograms[name] = [0] * (len(self.buckets) + 1) + [0.0]
+        hist[bisect.bisect_left(self.buckets, seconds)] += 1
+        hist[-1] += seconds
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP agent_span_duration_seconds Time spent per agent_step span.",
+            "# TYPE agent_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, hist in sorted(self._histograms.items()):
+                cumulative = 0
+                for le, count in zip(self.buckets + (float("inf"),), hist[:-1]):
+                    cumulative += count
+                    le_text = "+Inf" if le == float("inf") else repr(le)
+                    lines.append(f'agent_span_duration_seconds_bucket{{span="{name}",le="{le_text}"}} {cumulative}')
+                lines.append(f'agent_span_duration_seconds_sum{{span="{name}"}} {hist[-1]}')
+                lines.append(f'agent_span_duration_seconds_count{{span="{name}"}} {cumulative}')
+            lines.append("# HELP agent_turn_branch_total Turns by routing branch.")
+            lines.append("# TYPE agent_turn_branch_total counter")
+            for branch, count in sorted(self._branches.items()):
+                lines.append(f'agent_turn_branch_total{{branch="{branch}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        pass
+
+
+class MultiSink:
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def emit(self, root):
+        for sink in self.sinks:
+            sink.emit(root)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+# TRACE_JSONL_PATH turns on JSONL tracing without code changes
+if os.getenv("TRACE_JSONL_PATH"):
+    set_sink(JSONLSink(os.getenv("TRACE_JSONL_PATH")))
+    atexit.register(_sink.close)
@@ -0,0 +1,322 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import traceback
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs
+
+from agent.graph import agent_step_async
+from agent.sessions import SessionStore
+
+# Turns processed concurrently (one sender is never in more than one of them)
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "32"))
+# Message IDs remembered for dropping redelivered webhooks
+WEBHOOK_DEDUPE_SIZE = int(os.getenv("WEBHOOK_DEDUPE_SIZE", "100000"))
+
+
+class MessageDeduper:
+    """Remembers the last ``maxsize`` message IDs.
+
+    WhatsApp redelivers a webhook whenever it doesn't get a timely 200, so the
+    same message can arrive more than once.
+    """
+
+    def __init__(self, maxsize=WEBHOOK_DEDUPE_SIZE):
+        self.maxsize = maxsize
+        self._seen = OrderedDict()
+
+    def seen(self, message_id):
+        # True if message_id was already accepted; otherwise records it
+        if message_id in self._seen:
+            self._seen.move_to_end(message_id)
+            return True
+        self._seen[message_id] = None
+        if len(self._seen) > self.maxsize:
+            self._seen.popitem(last=False)
+        return False
+
+    def __len__(self):
+        return len(self._seen)
+
+
+def verify_signature(app_secret, body, header):
+    # Meta signs each webhook POST with the app secret:
+    # X-Hub-Signature-256: sha256=<hex HMAC-SHA256 of the raw body>
+    if not header or not header.startswith("sha256="):
+        return False
+    expected = hmac.new(app_secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, header[len("sha256="):])
+
+
+def parse_messages(payload):
+    # Yields (sender, message_id, text) for each text message in a WhatsApp
+    # Cloud API webhook payload; statuses and non-text messages are skipped
+    for entry in payload.get("entry", ()):
+        for change in entry.get("changes", ()):
+            for message in change.get("value", {}).get("messages", ()):
+                if message.get("type") == "text":
+                    yield message["from"], message["id"], message["text"]["body"]
+
+
+class SessionDispatcher:
+    """Runs turns on ``workers`` asyncio tasks, serially per sender.
+
+    Each sender has its own FIFO of pending messages, and a sender sits on
+    the shared ready queue at most once. So only one worker handles a given
+    sender at a time (its turns stay ordered and never race on its
+    AgentState), while different senders run in parallel. After each turn a
+    sender with more pending messages goes to the back of the ready queue,
+    so a chatty sender can't starve the rest.
+    """
+
+    def __init__(self, handle, workers=WEBHOOK_WORKERS):
+        self.handle = handle  # async handle(sender, message_id, text)
+        self.workers = workers
+        self.processed = 0
+        self.failed = 0
+        self._pending = {}  # sender -> deque of (message_id, text)
+        self._backlog = 0
+        self._ready = None
+        self._idle = None
+        self._tasks = []
+
+    def start(self):
+        # Must be called from the event loop that serves requests
+        if not self._tasks:
+            self._ready = asyncio.Queue()
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    def submit(self, sender, message_id, text):
+        self._backlog += 1
+        self._idle.clear()
+        queue = self._pending.get(sender)
+        if queue is None:
+            self._pending[sender] = deque([(message_id, text)])
+            self._ready.put_nowait(sender)
+        else:
+            # The sender is queued or being handled; its worker picks this up next
+            queue.append((message_id, text))
+
+    async def _work(self):
+        while True:
+            sender = await self._ready.get()
+            if sender is None:
+                return
+            queue = self._pending[sender]
+            message_id, text = queue.popleft()
+            try:
+                await self.handle(sender, message_id, text)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                traceback.print_exc()
+            finally:
+                self._backlog -= 1
+                if queue:
+                    self._ready.put_nowait(sender)
+                else:
+                    del self._pending[sender]
+                if not self._backlog:
+                    self._idle.set()
+
+    async def drain(self):
+        # Waits until every submitted message has been handled
+        if self._tasks:
+            await self._idle.wait()
+
+    async def close(self):
+        await self.drain()
+        for _ in self._tasks:
+            self._ready.put_nowait(None)
+        await asyncio.gather(*self._tasks)
+        self._tasks = []
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "backlog": self._backlog,
+            "active_senders": len(self._pending),
+        }
+
+
+class ReplyError(RuntimeError):
+    pass
+
+
+class WhatsAppReplySender:
+    """Sends replies through the WhatsApp Cloud API ``/{phone_number_id}/messages``
+    endpoint over pooled keep-alive connections. Each reply quotes the message
+    it answers (``context.message_id``).
+    """
+
+    def __init__(self, base_url, token, phone_number_id, pool_size=16, api_version="v19.0"):
+        from agent.llm_http import HTTPConnectionPool
+
+        self.pool = HTTPConnectionPool(base_url, size=pool_size)
+        self.path = f"/{api_version}/{phone_number_id}/messages"
+        self.headers = {"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+
+    async def send(self, to, text, message_id=None):
+        payload = {"messaging_product": "whatsapp", "to": to, "type": "text", "text": {"body": text}}
+        if message_id:
+            payload["context"] = {"message_id": message_id}
+        status, data = await asyncio.to_thread(
+            self.pool.request, "POST", self.path, json.dumps(payload), self.headers
+        )
+        if status >= 400:
+            raise ReplyError(f"WhatsApp API returned HTTP {status}: {data[:200]!r}")
+
+    def close(self):
+        self.pool.close()
+
+
+class PrintReplySender:
+    """Prints replies instead of sending them (local runs without API credentials)."""
+
+    async def send(self, to, text, message_id=None):
+        print(f"[{to}] {text}")
+
+    def close(self):
+        pass
+
+
+def reply_sender_from_env():
+    # WHATSAPP_API_URL + WHATSAPP_TOKEN + WHATSAPP_PHONE_NUMBER_ID send real
+    # replies; without them replies are printed
+    base_url = os.getenv("WHATSAPP_API_URL")
+    if not base_url:
+        return PrintReplySender()
+    return WhatsAppReplySender(base_url, os.getenv("WHATSAPP_TOKEN", ""), os.getenv("WHATSAPP_PHONE_NUMBER_ID", ""))
+
+
+class WebhookApp:
+    """ASGI app for the WhatsApp webhook.
+
+    ``GET /webhook`` answers Meta's subscription check, ``POST /webhook``
+    accepts message notifications and ``GET /stats`` reports counters.
+    With an ``app_secret`` (WHATSAPP_APP_SECRET), a POST whose
+    X-Hub-Signature-256 doesn't match the body is rejected with 403.
+    A POST is acknowledged as soon as its messages are queued: duplicates
+    (by message ID) are dropped and each new message goes to the sender's
+    serial queue on the SessionDispatcher. The turn loads the sender's
+    AgentState from the SessionStore, runs agent_step_async, saves the state
+    and sends the reply.
+
+    Ordering is guaranteed per process. To run several processes, route each
+    sender to the same one, e.g. by hashing the sender ID at the load balancer.
+    """
+
+    def __init__(self, sessions=None, reply_sender=None, workers=WEBHOOK_WORKERS,
+                 verify_token=None, dedupe_size=WEBHOOK_DEDUPE_SIZE, app_secret=None):
+        self.sessions = sessions if sessions is not None else SessionStore()
+        self.reply_sender = reply_sender if reply_sender is not None else reply_sender_from_env()
+        self.verify_token = verify_token if verify_token is not None else os.getenv("WHATSAPP_VERIFY_TOKEN", "")
+        self.app_secret = app_secret if app_secret is not None else os.getenv("WHATSAPP_APP_SECRET", "")
+        self.deduper = MessageDeduper(dedupe_size)
+        self.dispatcher = SessionDispatcher(self.handle_message, workers)
+        self.received = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+    async def handle_message(self, sender, message_id, text):
+        # Session I/O runs on a thread: with the SQLite backend, load and save
+        # wait on the store lock while the write-behind thread commits
+        state = await asyncio.to_thread(self.sessions.load, sender)
+        reply = await agent_step_async(state, text)
+        await asyncio.to_thread(self.sessions.save, sender, state)
+        await self.reply_sender.send(sender, reply, message_id)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+        self.dispatcher.start()
+        method, path = scope["method"], scope["path"]
+        if path == "/webhook" and method == "POST":
+            await self._receive_messages(scope, receive, send)
+        elif path == "/webhook" and method == "GET":
+            await self._verify(scope, send)
+        elif path == "/stats" and method == "GET":
+            await _respond(send, 200, self.stats())
+        else:
+            await _respond(send, 404, {"error": "not found"})
+
+    async def _receive_messages(self, scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        if self.app_secret:
+            header = dict(scope.get("headers", ())).get(b"x-hub-signature-256", b"").decode("latin-1")
+            if not verify_signature(self.app_secret, body, header):
+                self.rejected += 1
+                return await _respond(send, 403, {"error": "invalid signature"})
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return await _respond(send, 400, {"error": "invalid JSON"})
+
+        accepted = duplicates = 0
+        for sender, message_id, text in parse_messages(payload):
+            self.received += 1
+            if self.deduper.seen(message_id):
+                duplicates += 1
+                continue
+            self.dispatcher.submit(sender, message_id, text)
+            accepted += 1
+        self.duplicates += duplicates
+        await _respond(send, 200, {"accepted": accepted, "duplicates": duplicates})
+
+    async def _verify(self, scope, send):
+        params = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        mode = params.get("hub.mode", [""])[0]
+        token = params.get("hub.verify_token", [""])[0]
+        if mode == "subscribe" and self.verify_token and token == self.verify_token:
+            return await _respond(send, 200, params.get("hub.challenge", [""])[0].encode("utf-8"),
+                                  content_type=b"text/plain")
+        await _respond(send, 403, {"error": "verification failed"})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.dispatcher.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def shutdown(self):
+        # Finishes every accepted message, then persists sessions
+        await self.dispatcher.close()
+        await asyncio.to_thread(self.sessions.close)
+        self.reply_sender.close()
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            **self.dispatcher.stats(),
+        }
+
+
+async def _respond(send, status, body, content_type=b"application/json"):
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,93 @@
+"""Latency/throughput of micro-batched intent classification against a fake LLM.
+
+The fake LLM sleeps ``base`` seconds per call plus ``per_item`` per message
+in the prompt, which roughly models a hosted model's fixed round trip, and
+admits at most ``quota_rps`` calls per second like an API rate limit. Each
+scenario fires ``--messages`` classifications from ``--clients`` concurrent
+threads, first unbatched (one call per message), then through IntentBatcher
+at several window sizes.
+
+Run from the project root:  python -m bench.bench_intent_batch
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.intent import build_intent_prompt, parse_intent
+from agent.intent_batch import IntentBatcher
+from agent.llm import FakeLLM
+
+MESSAGES = [
+    "hmm not sure yet", "ok and then?", "what about teams", "is there a student discount",
+    "can it do shorts", "cool cool", "do you integrate with premiere", "maybe later",
+]
+
+
+class QuotaFakeLLM(FakeLLM):
+    def __init__(self, base=0.08, per_item=0.002, quota_rps=50):
+        super().__init__(latency=base, per_item=per_item)
+        self.quota_rps = quota_rps
+        self._next_slot = 0.0
+        self._slot_lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._slot_lock:
+            # Requests beyond the quota wait for the next free slot
+            slot = max(time.monotonic(), self._next_slot)
+            self._next_slot = slot + 1.0 / self.quota_rps
+        time.sleep(max(0.0, slot - time.monotonic()))
+        return super().invoke(prompt)
+
+
+def _drive(classify, total, clients):
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        classify(MESSAGES[i % len(MESSAGES)])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "throughput_per_s": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1e3,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1e3,
+    }
+
+
+def run(total=400, clients=64, windows_ms=(2, 5, 10), max_batch=16, quota_rps=50):
+    results = {}
+    llm = QuotaFakeLLM(quota_rps=quota_rps)
+    result = _drive(lambda m: parse_intent(llm.invoke(build_intent_prompt(m)).content), total, clients)
+    result["llm_calls"] = llm.calls
+    results["unbatched"] = result
+
+    for window in windows_ms:
+        llm = QuotaFakeLLM(quota_rps=quota_rps)
+        batcher = IntentBatcher(llm=llm, window=window / 1000, max_batch=max_batch)
+        result = _drive(batcher.classify, total, clients)
+        batcher.close()
+        result["llm_calls"] = llm.calls
+        result.update(batcher.stats())
+        results[f"batched_{window}ms"] = result
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--quota-rps", type=float, default=50)
+    args = parser.parse_args()
+    json.dump(run(args.messages, args.clients, max_batch=args.max_batch, quota_rps=args.quota_rps),
+              sys.stdout, indent=2)
+    print()
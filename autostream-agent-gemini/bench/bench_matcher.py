@@ -0,0 +1,94 @@
+"""Micro-benchmark: compiled KeywordMatcher vs the old per-call any() scans.
+
+Run from the project root:  python -m bench.bench_matcher
+"""
+import json
+import sys
+import timeit
+
+from agent.matcher import match_categories
+
+MESSAGES = [
+    "hi",
+    "what's the price of the pro plan?",
+    "can you compare basic and pro for me",
+    "what is your refund policy if I cancel after a week",
+    "why do you need my email?",
+    "thanks a lot, that was helpful",
+    "we're planning a launch party next month and need something for 4k edits",
+    "tell me about autostream and what services you provide",
+]
+
+
+def legacy_scan(msg):
+    # The scans graph.py and rag.py used to run per turn, list literals and all
+    q = msg.lower()
+    found = set()
+    if any(p in q for p in ["why", "what", "how", "when", "where", "who", "which",
+                            "do you need", "do you ask", "do you want", "do you require",
+                            "need my", "ask for", "want my", "require my", "why do", "why did"]):
+        found.add("question")
+    if any(w in q for w in ["why", "what for", "purpose", "reason"]):
+        found.add("why")
+    if any(p in q for p in ["details", "information", "data", "my", "you need", "you ask", "you collect",
+                            "you require", "you want", "you needed", "you asked", "you collected"]):
+        found.add("details")
+    if "what does" in q or "what do" in q:
+        found.add("what_does")
+    if "that" in q or "this" in q:
+        found.add("this_that")
+    if any(p in q for p in ["why these", "why my", "what about my", "what will you do", "what happens to"]):
+        found.add("lead_question")
+    if any(p in q for p in ["thanks", "thank you", "thank", "appreciate", "grateful", "ty", "thx"]):
+        found.add("gratitude")
+    if any(p in q for p in ["what is autostream", "what's autostream", "what does autostream",
+                            "tell me about autostream", "describe autostream", "explain autostream"]):
+        found.add("about_autostream")
+    if any(w in q for w in ["what", "tell me", "describe", "explain"]):
+        found.add("explain")
+    if "autostream" in q:
+        found.add("autostream")
+    if any(p in q for p in ["difference", "compare", "comparison", "both plans", "two plans",
+                            "all plans", "each plan", "versus", "vs", "which plan"]):
+        found.add("comparison")
+    words = q.split()
+    if any(w in ["pro", "professional", "premium"] for w in words) or \
+            any(p in q for p in ["pro plan", "professional plan", "premium plan"]):
+        found.add("pro")
+    if any(w in ["basic", "starter", "standard"] for w in words) or \
+            any(p in q for p in ["basic plan", "starter plan", "standard plan"]):
+        found.add("basic")
+    if any(w in q for w in ["plan", "price", "pricing", "cost", "subscription", "monthly", "fee"]):
+        found.add("pricing")
+    if any(p in q for p in ["tell me", "about", "information", "details", "what is", "what's"]):
+        found.add("info")
+    if any(w in q for w in ["policy", "policies", "refund", "money back", "cancel", "cancellation", "support"]):
+        found.add("policy")
+    if any(p in q for p in ["what can", "what do", "how can", "how do"]):
+        found.add("capability_question")
+    if any(w in q for w in ["feature", "what can", "capabilities", "do", "offer", "provide", "provides",
+                            "include", "includes", "service", "services"]):
+        found.add("features")
+    if any(p in q for p in ["what can you help", "what can you do", "what do you do",
+                            "how can you help", "what are you", "what services"]):
+        found.add("help")
+    return found
+
+
+def run(number=20000):
+    results = {}
+    for name, fn in [("legacy_any_scans", legacy_scan), ("keyword_matcher", match_categories)]:
+        seconds = min(timeit.repeat(lambda: [fn(m) for m in MESSAGES], number=number // len(MESSAGES), repeat=5))
+        calls = (number // len(MESSAGES)) * len(MESSAGES)
+        results[name] = {"us_per_message": seconds / calls * 1e6}
+    results["speedup"] = results["legacy_any_scans"]["us_per_message"] / results["keyword_matcher"]["us_per_message"]
+    # Substring false positives the old scans produced and the matcher doesn't
+    results["false_positives_fixed"] = {
+        m: sorted(legacy_scan(m) - match_categories(m)) for m in MESSAGES if legacy_scan(m) - match_categories(m)
+    }
+    return results
+
+
+if __name__ == "__main__":
+    json.dump(run(), sys.stdout, indent=2)
+    print()
@@ -0,0 +1,64 @@
+"""Startup benchmark: import cost of agent.graph with and without building the LLM client.
+
+"lazy" imports agent.graph only (what every CLI start, Streamlit rerun and
+rule/cache-resolved turn pays now). "eager" also calls agent.llm.get_llm(),
+which is what importing agent.graph used to cost. Import times come from
+``python -X importtime``.
+
+Run from the project root:  python -m bench.bench_startup [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+SCENARIOS = {
+    "lazy": "import agent.graph",
+    "eager": "import agent.graph, agent.llm; agent.llm.get_llm()",
+}
+
+
+def parse_importtime(stderr):
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure(code, runs):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    walls, imports, top = [], [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              cwd=project_root, env=env, capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1]}
+        modules = parse_importtime(proc.stderr)
+        imports.append(sum(self_us for self_us, _ in modules.values()))
+        top = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:10]
+    return {
+        "wall_ms_median": statistics.median(walls) * 1e3,
+        "import_ms_median": statistics.median(imports) / 1e3,
+        "modules_imported": len(modules),
+        "slowest_modules_self_ms": {name: self_us / 1e3 for name, (self_us, _) in top},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    json.dump({name: measure(code, args.runs) for name, code in SCENARIOS.items()}, sys.stdout, indent=2)
+    print()
@@ -0,0 +1,218 @@
+"""Load test of the webhook server (webhook.py) against a fake WhatsApp.
+
+A local fake of the WhatsApp Cloud API receives the agent's replies. Its
+sender side plays ``--users`` users at once. Each user fires its scripted
+messages back to back without waiting for replies, so every user's turns
+queue up on the server. ``--duplicate-rate`` of the webhooks are delivered
+twice, as WhatsApp does on retries. The fake LLM adds ``--llm-latency-ms`` to
+every intent call that reaches it.
+
+Reported: webhook ack latency, end-to-end latency (webhook sent -> reply
+received), throughput, and correctness checks: replies arriving out of
+order for a user, duplicate replies, and missing replies.
+
+Run from the project root:  python -m bench.bench_webhook --users 200 --messages 7
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agent import lead_index, lead_store, lead_writer, llm
+from agent.asgi import serve
+from agent.llm_http import HTTPConnectionPool
+from agent.sessions import SessionStore
+from agent.webhook import WebhookApp, WhatsAppReplySender
+from bench.run import _percentile
+
+# The lead_capture scenario plus messages the intent rules can't place, so
+# those turns wait on the (fake) LLM
+SCRIPT = [
+    "hi", "hmm, not sure yet", "can it do shorts", "I want to sign up for pro",
+    "Jane Doe", "jane@example.com", "YouTube", "what about teams", "thank you",
+]
+_LEAD_FIELDS = {4, 5, 6}  # positions of the name, email and platform answers
+
+
+class FakeWhatsAppAPI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY, Nagle
+    # plus delayed ACKs would add tens of ms to every reply
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        received_at = time.perf_counter()
+        replies = self.server.replies
+        with self.server.lock:
+            replies.setdefault(payload["to"], []).append((payload["context"]["message_id"], received_at))
+        data = b'{"messages":[{"id":"wamid.reply"}]}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _webhook_payload(user, message_id, text):
+    return json.dumps({
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"value": {"messages": [
+            {"from": user, "id": message_id, "type": "text", "text": {"body": text}},
+        ]}}]}],
+    })
+
+
+def _start_webhook(app):
+    # Serves the ASGI app on its own event loop thread; returns (url, loop)
+    loop = asyncio.new_event_loop()
+    bound = threading.Event()
+    address = []
+
+    def started(addr):
+        address.extend(addr)
+        bound.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve(app, "127.0.0.1", 0, started=started))
+
+    threading.Thread(target=run, name="webhook-server", daemon=True).start()
+    bound.wait()
+    return f"http://{address[0]}:{address[1]}", loop
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="webhook load test")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=len(SCRIPT), help="messages per user")
+    parser.add_argument("--workers", type=int, default=32, help="webhook turn workers")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent sending connections")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Leads captured by the scripted conversations stay in the temp dir
+        store = lead_store.LeadStore(os.path.join(tmp, "leads.jsonl"), json_path=None)
+        index = lead_index.LeadIndex(os.path.join(tmp, "leads.db"))
+        lead_writer._default_writer = lead_writer.LeadWriter(lead_index.IndexedLeadSink(store, index))
+        llm.set_llm(llm.FakeLLM(latency=args.llm_latency_ms / 1000))
+
+        api = ThreadingHTTPServer(("127.0.0.1", 0), FakeWhatsAppAPI)
+        api.daemon_threads = True
+        api.replies = {}
+        api.lock = threading.Lock()
+        threading.Thread(target=api.serve_forever, name="fake-whatsapp", daemon=True).start()
+        api_url = f"http://127.0.0.1:{api.server_address[1]}"
+
+        app = WebhookApp(
+            sessions=SessionStore(),
+            reply_sender=WhatsAppReplySender(api_url, "bench-token", "1000", pool_size=args.workers),
+            workers=args.workers,
+            verify_token="bench",
+        )
+        webhook_url, loop = _start_webhook(app)
+        pool = HTTPConnectionPool(webhook_url, size=args.clients)
+        headers = {"Content-Type": "application/json"}
+
+        sent = {}  # message_id -> perf_counter at send
+        expected = {}  # user -> message ids in send order
+        ack_latencies = []
+        duplicates_sent = 0
+        lock = threading.Lock()
+
+        def run_user(u):
+            nonlocal duplicates_sent
+            user = f"1555{u:07d}"
+            ids = []
+            for i in range(args.messages):
+                message_id = f"wamid.{user}.{i}"
+                text = SCRIPT[i % len(SCRIPT)]
+                if i % len(SCRIPT) not in _LEAD_FIELDS:
+                    # Unique suffix so intents aren't all served from the cache
+                    text = f"{text} #{u}"
+                body = _webhook_payload(user, message_id, text)
+                ids.append(message_id)
+                with lock:
+                    sent[message_id] = time.perf_counter()
+                t0 = time.perf_counter()
+                status, _ = pool.request("POST", "/webhook", body, headers)
+                with lock:
+                    ack_latencies.append(time.perf_counter() - t0)
+                if status != 200:
+                    raise RuntimeError(f"webhook returned {status}")
+                # Deterministic redelivery of a share of the webhooks
+                if args.duplicate_rate and (u * args.messages + i) % round(1 / args.duplicate_rate) == 0:
+                    pool.request("POST", "/webhook", body, headers)
+                    with lock:
+                        duplicates_sent += 1
+            with lock:
+                expected[user] = ids
+
+        total = args.users * args.messages
+        # Lead captures print to stdout; keep the JSON output clean
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.clients) as executor:
+                list(executor.map(run_user, range(args.users)))
+            deadline = time.monotonic() + args.timeout
+            while time.monotonic() < deadline:
+                with api.lock:
+                    if sum(len(r) for r in api.replies.values()) >= total:
+                        break
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            status, stats = pool.request("GET", "/stats")
+            asyncio.run_coroutine_threadsafe(app.shutdown(), loop).result(timeout=30)
+
+        pool.close()
+        api.shutdown()
+        lead_writer._default_writer.close()
+        store.close()
+        index.close()
+
+    end_to_end, out_of_order, duplicate_replies, missing = [], 0, 0, 0
+    for user, ids in expected.items():
+        replies = api.replies.get(user, [])
+        replied_ids = [message_id for message_id, _ in replies]
+        duplicate_replies += len(replied_ids) - len(set(replied_ids))
+        missing += len(set(ids) - set(replied_ids))
+        if replied_ids != ids[:len(replied_ids)]:
+            out_of_order += 1
+        end_to_end.extend(received_at - sent[message_id] for message_id, received_at in replies)
+    ack_latencies.sort()
+    end_to_end.sort()
+
+    print(json.dumps({
+        "users": args.users,
+        "messages": total,
+        "duplicates_sent": duplicates_sent,
+        "workers": args.workers,
+        "llm_latency_ms": args.llm_latency_ms,
+        "elapsed_s": elapsed,
+        "throughput_per_s": total / elapsed,
+        "ack_p50_ms": _percentile(ack_latencies, 50) * 1000,
+        "ack_p99_ms": _percentile(ack_latencies, 99) * 1000,
+        "reply_p50_ms": _percentile(end_to_end, 50) * 1000,
+        "reply_p99_ms": _percentile(end_to_end, 99) * 1000,
+        "users_out_of_order": out_of_order,
+        "duplicate_replies": duplicate_replies,
+        "missing_replies": missing,
+        "server": json.loads(stats),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""End-to-end benchmark of agent.graph.agent_step with a stubbed LLM.
+
+Replays scripted multi-turn conversations and reports per-turn latency
+percentiles, throughput and allocations per scenario. It also measures the
+lead store's append cost as the leads file grows and the cost of handing a
+lead to the background writer. The output is JSON, so results can be diffed
+across commits.
+
+Run from the project root:
+    python -m bench.run                        # print JSON to stdout
+    python -m bench.run --out bench.json       # save a run
+    python -m bench.run --baseline bench.json  # add % deltas vs a saved run
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from agent import lead_index, lead_store, lead_writer, llm
+from agent.state import AgentState
+
+SCENARIOS = {
+    "greeting": ["hi", "hello there", "thanks"],
+    "pricing_comparison": [
+        "what's the pricing?", "tell me about the pro plan", "and the price?",
+        "what's the difference between basic and pro?", "which plan has 4k?",
+    ],
+    "policy": ["what is your refund policy?", "do you offer support on basic?", "can I cancel anytime?"],
+    "lead_capture": [
+        "hi", "I want to sign up for pro", "Jane Doe", "jane@example.com", "YouTube",
+        "why did you need my details?", "thank you",
+    ],
+    "questions_mid_capture": [
+        "sign me up", "why do you need my name?", "Sam", "what will you do with my email?",
+        "sam@example.com", "which platforms?", "Instagram",
+    ],
+}
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _replay(agent_step, turns, iterations, latencies=None):
+    from agent.intent import intent_cache
+
+    # agent_step prints when a lead is captured; keep the JSON output clean
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(iterations):
+            intent_cache.clear()
+            state = AgentState()
+            for message in turns:
+                t0 = time.perf_counter()
+                agent_step(state, message)
+                if latencies is not None:
+                    latencies.append(time.perf_counter() - t0)
+
+
+def run_scenario(agent_step, turns, iterations):
+    # Timing pass first; allocations are measured in a separate, shorter pass
+    # because tracemalloc slows every allocation down
+    latencies = []
+    start = time.perf_counter()
+    _replay(agent_step, turns, iterations, latencies)
+    elapsed = time.perf_counter() - start
+
+    alloc_iterations = max(1, min(iterations, 20))
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    _replay(agent_step, turns, alloc_iterations)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "turns": len(latencies),
+        "p50_us": _percentile(latencies, 50) * 1e6,
+        "p95_us": _percentile(latencies, 95) * 1e6,
+        "p99_us": _percentile(latencies, 99) * 1e6,
+        "turns_per_s": len(latencies) / elapsed,
+        "alloc_peak_kb": (peak - before) / 1024,
+        "alloc_retained_kb_per_turn": (after - before) / 1024 / (alloc_iterations * len(turns)),
+    }
+
+
+def run_lead_store(directory, sizes=(0, 1000, 10000), samples=200):
+    # Per-append cost at increasing log sizes; with an append-only log this should stay flat
+    results = {}
+    lead = {"name": "Bench", "email": "bench@example.com", "platform": "youtube",
+            "timestamp": "2026-01-01T00:00:00", "status": "Lead captured successfully"}
+    for size in sizes:
+        path = Path(directory) / f"leads_{size}.jsonl"
+        store = lead_store.LeadStore(path, json_path=None)
+        for _ in range(size):
+            store.append(lead)
+        store.flush()
+        t0 = time.perf_counter()
+        for _ in range(samples):
+            store.append(lead)
+        per_append = (time.perf_counter() - t0) / samples
+        store.close()
+        results[str(size)] = {"append_us": per_append * 1e6, "file_kb": path.stat().st_size / 1024}
+    return results
+
+
+def run_lead_writer(directory, samples=2000):
+    # Latency a chat turn pays to hand a lead to the background writer, and
+    # how the writer batched them into the indexed sink
+    store = lead_store.LeadStore(Path(directory) / "leads_writer.jsonl", json_path=None)
+    index = lead_index.LeadIndex(Path(directory) / "leads_writer.db")
+    writer = lead_writer.LeadWriter(lead_index.IndexedLeadSink(store, index))
+    latencies = []
+    for i in range(samples):
+        lead = {"name": "Bench", "email": f"bench{i % (samples // 2)}@example.com", "platform": "youtube",
+                "timestamp": "2026-01-01T00:00:00", "status": "Lead captured successfully"}
+        t0 = time.perf_counter()
+        writer.submit(lead)
+        latencies.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    writer.close()
+    drain = time.perf_counter() - t0
+    store.close()
+    index.close()
+    latencies.sort()
+    return {
+        "submit_p50_us": _percentile(latencies, 50) * 1e6,
+        "submit_p99_us": _percentile(latencies, 99) * 1e6,
+        "drain_ms": drain * 1000,
+        **writer.stats(),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _add_deltas(results, baseline):
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        current["delta_pct"] = {
+            key: (current[key] - previous[key]) / previous[key] * 100
+            for key in ("p50_us", "p95_us", "p99_us", "turns_per_s")
+            if previous.get(key)
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="agent_step benchmark")
+    parser.add_argument("--iterations", type=int, default=200, help="replays per scenario")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="fake LLM latency per call")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only these")
+    parser.add_argument("--out", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="earlier results file to compute deltas against")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Captured leads go to a throwaway store, never data/leads.jsonl
+        lead_store._default_store = lead_store.LeadStore(os.path.join(tmp, "leads.jsonl"), json_path=None)
+        index = lead_index.LeadIndex(os.path.join(tmp, "leads.db"))
+        lead_writer._default_writer = lead_writer.LeadWriter(
+            lead_index.IndexedLeadSink(lead_store._default_store, index))
+        llm.set_llm(llm.FakeLLM(latency=args.llm_latency_ms / 1000))
+        from agent.graph import agent_step
+
+        names = args.scenario or list(SCENARIOS)
+        results = {
+            "meta": {
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "iterations": args.iterations,
+                "llm_latency_ms": args.llm_latency_ms,
+            },
+            "scenarios": {name: run_scenario(agent_step, SCENARIOS[name], args.iterations) for name in names},
+            "lead_store": run_lead_store(tmp),
+            "lead_writer": run_lead_writer(tmp),
+        }
+        lead_writer._default_writer.close()
+        lead_store._default_store.close()
+        index.close()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            _add_deltas(results, json.load(f))
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,6 @@
 import os
 import warnings
 from dotenv import load_dotenv
-from agent.state import AgentState
-from agent.graph import agent_step
 
 # Suppress SSL warnings from gRPC
 os.environ['GRPC_VERBOSITY'] = 'ERROR'
@@ -12,6 +10,11 @@ warnings.filterwarnings('ignore', category=UserWarning)
 # Load environment variables from .env file (override system env vars)
 load_dotenv(override=True)
 
+# Agent modules read their settings (INTENT_*, LEAD_*, WEBHOOK_WORKERS, ...)
+# from the environment at import, so they're imported after .env is loaded
+from agent.state import AgentState
+from agent.graph import agent_step_stream
+
 state = AgentState()
 
 print("AutoStream Agent (CLI Mode). Type exit to quit.")
@@ -21,5 +24,8 @@ while True:
     if user.lower() == "exit":
         break
 
-    reply = agent_step(state, user)
-    print("Agent:", reply)
+    # Print the reply chunk by chunk, as the UI renders it
+    print("Agent:", end=" ", flush=True)
+    for chunk in agent_step_stream(state, user):
+        print(chunk, end="", flush=True)
+    print()
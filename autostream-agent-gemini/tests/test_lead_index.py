@@ -0,0 +1,31 @@
+from agent.lead_index import IndexedLeadSink, LeadIndex
+from agent.lead_store import LeadStore
+
+
+def lead(email, platform, timestamp, name="Jo"):
+    return {"name": name, "email": email, "platform": platform, "timestamp": timestamp}
+
+
+def test_counts_every_logged_capture(tmp_path):
+    store = LeadStore(tmp_path / "leads.jsonl", json_path=None)
+    index = LeadIndex(tmp_path / "leads.db")
+    sink = IndexedLeadSink(store, index)
+
+    outcomes = sink.append_many([
+        lead("jo@example.com", "YouTube", "2026-01-01"),
+        lead("jo@example.com", "TikTok", "2026-01-02"),
+        lead("jo@example.com", "TikTok", "2026-01-03"),
+    ])
+
+    assert outcomes == ["inserted", "updated", "duplicate"]
+    assert len(list(store.iter_leads())) == 2
+    # The earlier YouTube capture still counts after the email moved to TikTok
+    assert index.count("youtube") == 1
+    assert index.count("tiktok") == 1
+    assert index.count(since="2026-01-01", until="2026-01-02") == 1
+    assert index.get("JO@example.com")["captures"] == 3
+
+    assert index.rebuild(store.iter_leads()) == 2
+    assert index.count() == 2
+    index.close()
+    store.close()
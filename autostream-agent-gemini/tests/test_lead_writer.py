@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from agent.lead_writer import LeadWriter
+
+
+class FailingSink:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.leads = []
+
+    def append_many(self, leads):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OSError("disk full")
+        self.leads.extend(leads)
+
+
+def make_writer(sink, tmp_path):
+    return LeadWriter(sink, flush_interval=0.01, retries=2, retry_backoff=0.001,
+                      dead_letter_path=tmp_path / "failed.jsonl")
+
+
+def test_failed_batch_is_retried(tmp_path):
+    sink = FailingSink(failures=2)
+    writer = make_writer(sink, tmp_path)
+    future = writer.submit({"email": "a@example.com"})
+    assert future.result(timeout=5) is True
+    writer.close()
+    assert sink.leads == [{"email": "a@example.com"}]
+    assert writer.stats()["retried"] == 2
+    assert not (tmp_path / "failed.jsonl").exists()
+
+
+def test_sink_error_dead_letters_the_lead(tmp_path, capsys):
+    sink = FailingSink(failures=10)
+    writer = make_writer(sink, tmp_path)
+    future = writer.submit({"email": "b@example.com"})
+    with pytest.raises(OSError):
+        future.result(timeout=5)
+    writer.close()
+
+    assert sink.calls == 3
+    stats = writer.stats()
+    assert stats["errors"] == 1 and stats["dead_lettered"] == 1
+    lines = (tmp_path / "failed.jsonl").read_text().splitlines()
+    assert json.loads(lines[0])["lead"] == {"email": "b@example.com"}
+    assert "b@example.com" in capsys.readouterr().err
@@ -3,8 +3,6 @@ import os
 import warnings
 import streamlit as st
 from dotenv import load_dotenv
-from agent.state import AgentState
-from agent.graph import agent_step
 
 # Suppress SSL warnings from gRPC
 os.environ['GRPC_VERBOSITY'] = 'ERROR'
@@ -15,6 +13,11 @@ warnings.filterwarnings('ignore', category=UserWarning)
 # override=True ensures .env file takes precedence over system environment variables
 load_dotenv(override=True)
 
+# Agent modules read their settings (INTENT_*, LEAD_*, WEBHOOK_WORKERS, ...)
+# from the environment at import, so they're imported after .env is loaded
+from agent.state import AgentState
+from agent.graph import agent_step_stream
+
 st.set_page_config(page_title="AutoStream AI Agent")
 
 if "state" not in st.session_state:
@@ -25,11 +28,23 @@ st.title("🤖 AutoStream Conversational AI (Gemini)")
 
 user_input = st.text_input("You:", key="input")
 
+pending = None
 if st.button("Send") and user_input:
-    state = st.session_state.state
-    response = agent_step(state, user_input)
+    pending = user_input
     st.session_state.chat.append(("User", user_input))
-    st.session_state.chat.append(("Agent", response))
 
 for sender, msg in st.session_state.chat:
     st.write(f"**{sender}:** {msg}")
+
+if pending is not None:
+    # Render the reply incrementally, then keep it in the transcript
+    chunks = []
+
+    def stream_reply():
+        yield "**Agent:** "
+        for chunk in agent_step_stream(st.session_state.state, pending):
+            chunks.append(chunk)
+            yield chunk
+
+    st.write_stream(stream_reply())
+    st.session_state.chat.append(("Agent", "".join(chunks)))
@@ -0,0 +1,72 @@
+"""WhatsApp webhook server (ASGI).
+
+    python webhook.py --port 8000        # uvicorn if installed, else the built-in server
+    uvicorn webhook:app --port 8000      # any ASGI server works
+
+Point the WhatsApp Cloud API webhook at https://<host>/webhook and set
+WHATSAPP_VERIFY_TOKEN to the token entered in the Meta dashboard, and
+WHATSAPP_APP_SECRET to the app secret so POSTs are checked against their
+X-Hub-Signature-256 header. Replies
+go out through WHATSAPP_API_URL / WHATSAPP_TOKEN / WHATSAPP_PHONE_NUMBER_ID,
+or are printed when those aren't set. SESSION_DB_PATH keeps sessions in
+SQLite instead of memory. Every turn is appended to data/transcripts.jsonl
+(TRANSCRIPT_PATH to move it).
+"""
+import argparse
+import asyncio
+import os
+import warnings
+from dotenv import load_dotenv
+
+# Suppress SSL warnings from gRPC
+os.environ['GRPC_VERBOSITY'] = 'ERROR'
+os.environ['GLOG_minloglevel'] = '2'
+warnings.filterwarnings('ignore', category=UserWarning)
+
+# Load environment variables from .env file (override system env vars)
+load_dotenv(override=True)
+
+# Agent modules read their settings (INTENT_*, LEAD_*, WEBHOOK_WORKERS, ...)
+# from the environment at import, so they're imported after .env is loaded
+from agent.history import DEFAULT_TRANSCRIPT_PATH, TranscriptLog
+from agent.sessions import SessionStore, SQLiteSessionBackend
+from agent.webhook import WEBHOOK_WORKERS, WebhookApp
+
+session_db = os.getenv("SESSION_DB_PATH")
+# Full transcripts; each session keeps only its last HISTORY_WINDOW turns
+transcript = TranscriptLog(os.getenv("TRANSCRIPT_PATH") or DEFAULT_TRANSCRIPT_PATH)
+backend = SQLiteSessionBackend(session_db) if session_db else None
+sessions = SessionStore(backend, transcript=transcript)
+
+# Keep this a single process: per-sender ordering is guaranteed within one
+# app, and WEBHOOK_WORKERS turns already run concurrently inside it
+app = WebhookApp(sessions=sessions, workers=WEBHOOK_WORKERS)
+if not app.app_secret:
+    print("WHATSAPP_APP_SECRET is not set: webhook signatures are NOT verified")
+
+
+async def run_builtin(host, port):
+    from agent.asgi import serve
+
+    try:
+        await serve(app, host, port, started=lambda addr: print(f"Webhook listening on http://{addr[0]}:{addr[1]}/webhook"))
+    finally:
+        await app.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AutoStream WhatsApp webhook")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        uvicorn = None
+    if uvicorn is not None:
+        uvicorn.run(app, host=args.host, port=args.port)
+    else:
+        try:
+            asyncio.run(run_builtin(args.host, args.port))
+        except KeyboardInterrupt:
+            pass